@@ -0,0 +1,142 @@
+"""Mood trends from journal entries and chat messages.
+
+An incremental batch pipeline: ``MoodPipeline.update`` scores only entries
+written since the last run (tracked by a per-source ID watermark) and
+stores one row per entry in ``mood_scores``. ``daily_trends`` then reads
+those rows and builds per-day aggregates, rolling averages and streaks with
+vectorized pandas/NumPy operations, so opening the chart never rescans the
+text.
+
+Run ``python analytics.py`` to score everything pending for every user,
+e.g. from a nightly job.
+"""
+import datetime
+import re
+
+import numpy as np
+import pandas as pd
+
+from chatbot import INTENTS
+
+SOURCES = ("journal", "chat")
+TREND_DAYS = 90
+ROLLING_DAYS = 7
+
+# A small sentiment lexicon tuned to the way people write about stress and family life.
+POSITIVE_WORDS = {
+    "calm", "calmer", "happy", "happier", "grateful", "thankful", "proud", "relaxed", "rested",
+    "joy", "joyful", "love", "loved", "better", "good", "great", "peaceful", "hopeful", "fun",
+    "win", "wins", "laugh", "laughed", "smile", "smiled", "energized", "okay", "fine", "lovely",
+}
+NEGATIVE_WORDS = {
+    "sad", "down", "depressed", "anxious", "anxiety", "angry", "upset", "lonely", "tired",
+    "exhausted", "overwhelmed", "stressed", "stressful", "worried", "worry", "guilty", "awful",
+    "terrible", "bad", "worse", "cry", "cried", "crying", "frustrated", "hopeless", "burnout",
+    "drained", "panic", "scared", "hurt",
+}
+NEGATIONS = {"not", "no", "never", "hardly", "dont", "didnt", "isnt", "wasnt", "cant", "couldnt"}
+# Stress keywords are the chatbot's own "stress" triggers, so the chart and the bot agree.
+_STRESS_TRIGGERS = next(intent["triggers"] for intent in INTENTS if intent["name"] == "stress")
+STRESS_WORDS = {trigger for trigger in _STRESS_TRIGGERS if " " not in trigger}
+STRESS_PHRASES = [trigger for trigger in _STRESS_TRIGGERS if " " in trigger]
+
+_WORD_RE = re.compile(r"[a-z']+")
+
+
+def score_text(text):
+    """``(sentiment, stress_hits)`` for one entry; sentiment is in [-1, 1]."""
+    words = [word.replace("'", "") for word in _WORD_RE.findall(text.lower())]
+    total = 0
+    negate = False
+    for word in words:
+        polarity = (word in POSITIVE_WORDS) - (word in NEGATIVE_WORDS)
+        total += -polarity if negate else polarity
+        negate = word in NEGATIONS
+    joined = " ".join(words)
+    stress_hits = sum(word in STRESS_WORDS for word in words)
+    stress_hits += sum(joined.count(phrase) for phrase in STRESS_PHRASES)
+    sentiment = total / max(1.0, len(words) ** 0.5)
+    return max(-1.0, min(1.0, sentiment)), stress_hits
+
+
+class MoodPipeline:
+    """Scores new entries and serves precomputed trends."""
+
+    def __init__(self, db, batch_size=1000):
+        self.db = db
+        self.batch_size = batch_size
+
+    def update(self, owner):
+        """Score everything written since the last run. Returns the number scored."""
+        scored = 0
+        for source in SOURCES:
+            last_id = self.db.get_mood_watermark(owner, source)
+            while True:
+                rows = self.db.list_unscored(owner, source, last_id, self.batch_size)
+                if not rows:
+                    break
+                scores = []
+                for row in rows:
+                    sentiment, stress_hits = score_text(row["content"])
+                    scores.append({
+                        "id": row["id"], "created": row["created"],
+                        "sentiment": sentiment, "stress_hits": stress_hits,
+                    })
+                last_id = rows[-1]["id"]
+                self.db.save_mood_scores(owner, source, scores, last_id)
+                scored += len(scores)
+        return scored
+
+    def daily_trends(self, owner, days=TREND_DAYS, today=None):
+        """Per-day mood aggregates for the last ``days`` days.
+
+        Returns a DataFrame indexed by date with ``entries``, ``sentiment``
+        (daily mean), ``sentiment_7d`` (rolling mean), ``stress_hits`` and
+        ``stress_7d``. Days without entries are present with zero entries.
+        """
+        today = today or datetime.date.today()
+        start = today - datetime.timedelta(days=days - 1)
+        rows = self.db.list_mood_scores(owner, start)
+        index = pd.date_range(start, today, freq="D", name="date")
+        if not rows:
+            return pd.DataFrame(
+                {"entries": 0, "sentiment": np.nan, "sentiment_7d": np.nan, "stress_hits": 0, "stress_7d": 0.0},
+                index=index,
+            )
+
+        scores = pd.DataFrame(rows)
+        scores["date"] = pd.to_datetime(scores["created"], format="ISO8601").dt.normalize()
+        daily = scores.groupby("date").agg(
+            entries=("sentiment", "size"),
+            sentiment=("sentiment", "mean"),
+            stress_hits=("stress_hits", "sum"),
+        ).reindex(index)
+        daily["entries"] = daily["entries"].fillna(0).astype(int)
+        daily["stress_hits"] = daily["stress_hits"].fillna(0).astype(int)
+        daily["sentiment_7d"] = daily["sentiment"].rolling(ROLLING_DAYS, min_periods=1).mean()
+        daily["stress_7d"] = daily["stress_hits"].rolling(ROLLING_DAYS, min_periods=1).mean()
+        return daily
+
+    @staticmethod
+    def streaks(daily):
+        """Current run lengths ending today: days with an entry, and check-in days without stress words."""
+        wrote = daily["entries"].to_numpy() > 0
+        calm = wrote & (daily["stress_hits"].to_numpy() == 0)
+        return {"writing": _trailing_run(wrote), "calm": _trailing_run(calm)}
+
+
+def _trailing_run(flags):
+    """Length of the run of True values at the end of ``flags``."""
+    misses = np.flatnonzero(~flags)
+    return int(len(flags) - (misses[-1] + 1)) if len(misses) else int(len(flags))
+
+
+if __name__ == "__main__":
+    from storage import Storage
+
+    db = Storage()
+    pipeline = MoodPipeline(db)
+    for owner in db.list_owners():
+        count = pipeline.update(owner)
+        if count:
+            print(f"{owner}: scored {count} new entries")
@@ -1,6 +1,31 @@
 import streamlit as st
+import streamlit.components.v1 as components
+from streamlit.errors import StreamlitAPIException
+import collections
 import datetime
-import time
+import hashlib
+import io
+import itertools
+import os
+import re
+import tempfile
+import uuid
+
+import pandas as pd
+
+from analytics import MoodPipeline
+from auth import CredentialStore
+from calendar_sync import CalendarSync
+from chatbot import CHAT_WINDOW, ChatWorkerPool, ResponseCache, default_backend, update_summary
+from events import EventStore, calendar_html, calendar_window
+from feed import FEED_PAGE_SIZE, CommunityFeed
+from games import DIFFICULTY_CLUES, LEFT, RIGHT, UP, DOWN, add_tile, board_html, can_move, conflicts, move, new_board
+from puzzles import PuzzleBank
+from sessions import SessionMemory
+from storage import Storage
+from tasks import FREQUENCIES, TaskStore
+
+THEME_CSS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "momenta.css")
 
 # ==========================================
 # PAGE CONFIGURATION & THEME
@@ -12,203 +37,630 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS for Native Dark Mode with Lavender & Sage Accents
-st.markdown("""
-<style>
-    /* Color Palette Variables - DARK MODE */
-    :root {
-        --sage-green: #7BB08A; /* Brighter sage for dark bg */
-        --lavender: #B5A1D9;   /* Brighter lavender for dark bg */
-        --text-main: #FFFFFF;
-        --text-muted: #CBD5E1;
-        --bg-card: #1E293B;    /* Slate-800 for cards/boxes */
-    }
-    
-    /* Text Colors */
-    p, li, span, div.stMarkdown {
-        color: var(--text-main) !important;
-    }
-    
-    /* Gradient Headers */
-    h1, h2, h3, h4, h5, h6 {
-        color: var(--text-main) !important;
-        font-weight: 800 !important;
-        font-family: 'Helvetica Neue', Helvetica, Arial, sans-serif;
-        letter-spacing: -0.02em;
-    }
-    
-    .gradient-text {
-        background: -webkit-linear-gradient(45deg, var(--sage-green), var(--lavender));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-    }
-    
-    /* Catchphrase */
-    .catchphrase {
-        font-size: 1.4rem;
-        color: var(--text-muted) !important; 
-        text-align: center;
-        margin-bottom: 2.5rem;
-        font-weight: 400;
-    }
-    
-    /* All Buttons (Login, Submit, etc.) */
-    div.stButton > button, div[data-testid="stFormSubmitButton"] > button {
-        background: linear-gradient(90deg, var(--sage-green), var(--lavender)) !important;
-        border: none !important;
-        border-radius: 30px !important;
-        padding: 10px 24px !important;
-        box-shadow: 0 4px 6px rgba(0,0,0,0.3) !important;
-        transition: all 0.3s ease !important;
-    }
-    /* Force button text to be white ALWAYS */
-    div.stButton > button *, div[data-testid="stFormSubmitButton"] > button * {
-        color: #FFFFFF !important;
-        font-weight: 600 !important;
-    }
-    div.stButton > button:hover, div[data-testid="stFormSubmitButton"] > button:hover {
-        box-shadow: 0 6px 12px rgba(0,0,0,0.5) !important;
-        transform: translateY(-1px) !important;
-        opacity: 0.90 !important;
-    }
-    
-    /* Text Inputs & Text Areas - Dark theme with Sage border */
-    div[data-baseweb="input"] > div,
-    div[data-baseweb="base-input"],
-    div[data-baseweb="base-input"] > input,
-    div[data-baseweb="textarea"] > textarea,
-    div[data-baseweb="select"] > div {
-        background-color: #0F172A !important; /* Very dark slate */
-        color: var(--text-main) !important;
-        border: 1px solid var(--sage-green) !important;
-        border-radius: 6px;
-    }
-    
-    /* Placeholder text inside inputs */
-    input::placeholder, textarea::placeholder {
-        color: #64748B !important;
-    }
-    
-    /* Expander/Cards */
-    .streamlit-expanderHeader {
-        background-color: var(--bg-card) !important;
-        color: var(--text-main) !important;
-        border-radius: 8px;
-        border: 1px solid #334155;
-        font-weight: 600;
-    }
-    
-    /* Tabs */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 12px;
-    }
-    .stTabs [data-baseweb="tab"] {
-        background-color: transparent !important;
-        border: 1px solid #334155 !important;
-        border-radius: 8px 8px 0 0 !important;
-        padding: 10px 20px !important;
-        color: var(--text-muted) !important;
-    }
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(90deg, var(--sage-green), var(--lavender)) !important;
-        border: none !important;
-    }
-    /* Active tab text color */
-    .stTabs [aria-selected="true"] * {
-        color: #FFFFFF !important;
-        font-weight: 600 !important;
-    }
-    
-    /* Custom Info Box */
-    .info-box {
-        background-color: var(--bg-card);
-        padding: 25px;
-        border-radius: 12px;
-        border-top: 5px solid var(--lavender);
-        box-shadow: 0 4px 6px -1px rgba(0,0,0,0.3);
-        margin-bottom: 20px;
-        color: var(--text-main);
-    }
-    .info-box h3 {
-        color: var(--text-main) !important;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS for Native Dark Mode with Lavender & Sage Accents. The stylesheet
+# lives in static/momenta.css; a minified copy is written once per process and
+# served through Streamlit's component file route, which sets a text/css
+# Content-Type (the plain static route sends .css as text/plain with nosniff).
+# Every full run only sends the short <link> tag, and the browser fetches the
+# file once and keeps it. The file name carries a content hash so an edited
+# stylesheet is picked up without a stale cache.
+def minify_css(css):
+    """Strip comments and the whitespace that CSS does not need."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,>])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+@st.cache_resource
+def theme_stylesheet():
+    """A <link> to the minified theme on the component file route."""
+    with open(THEME_CSS, encoding="utf-8") as f:
+        css = minify_css(f.read())
+    filename = f"momenta.{hashlib.sha256(css.encode()).hexdigest()[:12]}.min.css"
+    build_dir = tempfile.mkdtemp(prefix="momenta-theme-")
+    with open(os.path.join(build_dir, filename), "w", encoding="utf-8") as f:
+        f.write(css)
+    theme = components.declare_component("theme", path=build_dir)
+    return f'<link rel="stylesheet" href="component/{theme.name}/{filename}">'
+
+st.markdown(theme_stylesheet(), unsafe_allow_html=True)
 
 # ==========================================
 # SESSION STATE INITIALIZATION
 # ==========================================
+@st.cache_resource
+def get_storage():
+    """One shared database handle per process, reused by every session."""
+    return Storage()
+
+db = get_storage()
+
+@st.cache_resource
+def get_feed():
+    """The community feed shared by every session in this process."""
+    return CommunityFeed(db)
+
+feed = get_feed()
+
+@st.cache_resource
+def get_credentials():
+    """Password verifier and session-token cache shared by every session."""
+    return CredentialStore(db)
+
+creds = get_credentials()
+
+@st.cache_resource
+def get_chat_pool():
+    """Worker pool that runs the chatbot backend off the script thread."""
+    return ChatWorkerPool(default_backend())
+
+chat_pool = get_chat_pool()
+
+@st.cache_resource
+def get_response_cache():
+    """Finished chatbot replies shared across sessions, keyed by normalized message."""
+    return ResponseCache()
+
+response_cache = get_response_cache()
+
+@st.cache_resource
+def get_task_store():
+    """Indexed to-do lists shared by every session, written through to the database."""
+    return TaskStore(db)
+
+task_store = get_task_store()
+
+@st.cache_resource
+def get_mood_pipeline():
+    """Incremental mood scoring over journals and chat, shared by every session."""
+    return MoodPipeline(db)
+
+mood_pipeline = get_mood_pipeline()
+
+@st.cache_resource
+def get_event_store():
+    """Imported calendar events, indexed by time range, shared by every session."""
+    return EventStore(db)
+
+event_store = get_event_store()
+
+@st.cache_resource
+def get_calendar_sync():
+    """Thread pool that keeps calendars linked by URL up to date."""
+    return CalendarSync(db, event_store)
+
+calendar_sync = get_calendar_sync()
+
+@st.cache_resource
+def get_puzzle_bank():
+    """Pre-generated Sudoku puzzles, refilled by a background process pool."""
+    return PuzzleBank(db)
+
+puzzle_bank = get_puzzle_bank()
+
+# Session-state keys owned by each dashboard section. They are dropped (or,
+# for games in progress, stashed in the database) while another section is
+# on screen, and each section rebuilds its own keys when it runs.
+SECTION_STATE = {
+    "📔 Journaling": ("journal_cursors",),
+    "🤖 CBT Chatbot": ("chat_window",),
+    "🧩 Brain Games": ("sudoku", "game_2048"),
+    "🌐 Momenta Network": ("feed_view", "feed_last_id", "feed_visible"),
+}
+SESSION_STATE_KEYS = [key for keys in SECTION_STATE.values() for key in keys]
+
+@st.cache_resource
+def get_session_memory():
+    """Per-session memory accounting and the cold-state offload policy."""
+    return SessionMemory(db, persistent=("sudoku", "game_2048"), shared=feed.buffered)
+
+session_memory = get_session_memory()
+
 if 'logged_in' not in st.session_state:
     st.session_state.logged_in = False
 if 'current_user' not in st.session_state:
     st.session_state.current_user = None
-if 'users' not in st.session_state:
-    st.session_state.users = {'demo_mom': 'password123'} # Pre-loaded demo account
-if 'family_members' not in st.session_state:
-    st.session_state.family_members = []
-if 'tasks' not in st.session_state:
-    st.session_state.tasks = []
-if 'journals' not in st.session_state:
-    st.session_state.journals = []
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
-if 'community_posts' not in st.session_state:
-    # Seeded with some fake data for the networking tab
-    st.session_state.community_posts = [
-        {"user": "Sarah J.", "time": "2 hours ago", "content": "Just finished a 5-minute breathing exercise in the car before picking up the kids. Small wins! 🌿"},
-        {"user": "Elena M.", "time": "5 hours ago", "content": "The new Wordle completely stumped me today. Still, a good brain workout. Anyone else struggling?"}
-    ]
+if 'auth_token' not in st.session_state:
+    st.session_state.auth_token = None
+if st.session_state.logged_in and creds.session_user(st.session_state.auth_token) != st.session_state.current_user:
+    # Token expired or was evicted from the cache - ask for the password again,
+    # parking games in progress for the next login as logout() does
+    session_memory.offload(st.session_state.current_user, st.session_state, SESSION_STATE_KEYS)
+    st.session_state.logged_in = False
+    st.session_state.current_user = None
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # ==========================================
 # HELPER FUNCTIONS
 # ==========================================
 def login(username, password):
-    if username in st.session_state.users and st.session_state.users[username] == password:
+    token = creds.login(username, password)
+    if token:
+        st.session_state.auth_token = token
         st.session_state.logged_in = True
         st.session_state.current_user = username
-        st.success("Successfully logged in!")
-        time.sleep(1)
+        # Shown as a toast on the next run instead of holding this thread open
+        st.session_state.flash = "Successfully logged in!"
         st.rerun()
     else:
         st.error("Invalid username or password.")
 
 def signup(username, password):
-    if username in st.session_state.users:
-        st.error("Username already exists. Please choose another.")
-    elif len(username) < 3 or len(password) < 6:
+    if len(username) < 3 or len(password) < 6:
         st.error("Username must be at least 3 characters and password at least 6 characters.")
+    elif not creds.register(username, password):
+        st.error("Username already exists. Please choose another.")
     else:
-        st.session_state.users[username] = password
         st.success("Account created! Please log in.")
 
 def logout():
+    # Park games in progress for the next login and drop the rest of the section state
+    session_memory.offload(st.session_state.current_user, st.session_state, SESSION_STATE_KEYS)
+    creds.logout(st.session_state.auth_token)
+    st.session_state.auth_token = None
     st.session_state.logged_in = False
     st.session_state.current_user = None
     st.rerun()
 
-def simple_cbt_bot(user_message):
-    """A simulated CBT bot that responds based on keywords."""
-    msg = user_message.lower()
-    if any(word in msg for word in ["stress", "overwhelm", "too much", "busy"]):
-        return "It sounds like you're carrying a heavy load right now. In CBT, we look at how to break large stressors into smaller, manageable pieces. What is ONE small thing you can control right now?"
-    elif any(word in msg for word in ["tired", "exhausted", "sleep"]):
-        return "Being a working mom is incredibly demanding on your nervous system. Your brain needs rest to form new neural pathways (neuroplasticity). Can you find a 10-minute window for yourself today just to breathe?"
-    elif any(word in msg for word in ["kid", "child", "husband", "family"]):
-        return "Family dynamics can trigger automatic negative thoughts. Let's reframe: Instead of thinking 'I have to do everything perfectly,' try 'I am doing my best, and good enough is perfectly fine.' How does that feel?"
-    elif any(word in msg for word in ["sad", "depressed", "down"]):
-        return "I hear you. It's completely valid to feel that way. What is a small, healthy habit that usually brings you a tiny bit of joy? A hot cup of tea? A short walk?"
+def rerun_tab():
+    """Rerun only the current tab's fragment, or the whole script when the
+    tab is being drawn as part of a full run (e.g. right after navigating)."""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+def format_entry_date(created):
+    return created.strftime("%B %d, %Y - %I:%M %p")
+
+# ==========================================
+# DASHBOARD TABS
+# ==========================================
+# Each tab body is a fragment, so an interaction inside one tab reruns and
+# re-sends only that tab instead of the whole script. Only the section
+# picked in the dashboard navigation is run at all.
+
+# --- TAB 1: FAMILY MANAGER ---
+@st.fragment
+def family_tab(user):
+    family_members = db.list_members(user)
+
+    st.header("Family Manager & Mental Offloading")
+    st.markdown("Offload your mental to-do list here to reduce cognitive overload.")
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.subheader("Add Family Member")
+        with st.form("add_member_form"):
+            member_name = st.text_input("Name")
+            member_desig = st.selectbox("Designation", ["Child", "Spouse", "Self", "Pet", "Other"])
+            add_mem = st.form_submit_button("Add Member")
+            if add_mem and member_name:
+                db.add_member(user, member_name, member_desig)
+                rerun_tab()
+                
+        st.markdown("**Current Members:**")
+        for m in family_members:
+            st.markdown(f"- **{m['name']}** ({m['designation']})")
+
+    with col2:
+        st.subheader("Assign Tasks")
+        if not family_members:
+            st.info("Add a family member on the left to start assigning tasks.")
+        else:
+            with st.form("add_task_form"):
+                task_desc = st.text_input("Task Description (e.g., Pack lunch, Sign permission slip)")
+                assignee = st.selectbox("Assign To", [m['name'] for m in family_members])
+                frequency = st.selectbox("Frequency", FREQUENCIES)
+                task_start = st.date_input("Due / starting on", value=datetime.date.today())
+                add_task = st.form_submit_button("Add Task")
+                if add_task and task_desc:
+                    task_store.add(user, task_desc, assignee, frequency, task_start)
+                    rerun_tab()
+            
+            st.markdown("### To-Do List")
+            todo_day = st.date_input("Showing chores for", value=datetime.date.today())
+            col_who, col_status, col_freq = st.columns(3)
+            with col_who:
+                show_who = st.selectbox("Assigned to", ["Everyone"] + [m['name'] for m in family_members])
+            with col_status:
+                show_status = st.selectbox("Status", ["All", "To do", "Done"])
+            with col_freq:
+                show_freq = st.selectbox("Repeats", ["Any"] + FREQUENCIES)
+
+            # Filtered from the in-memory indexes; recurring chores are expanded for this day only
+            items = task_store.agenda(
+                user, todo_day, todo_day,
+                assignee=None if show_who == "Everyone" else show_who,
+                frequency=None if show_freq == "Any" else show_freq,
+                done={"All": None, "To do": False, "Done": True}[show_status],
+            )
+            if not items:
+                st.write("No tasks here. You're all caught up!")
+            else:
+                for item in items:
+                    task = item['task']
+                    col_chk, col_text, col_tag = st.columns([0.1, 0.7, 0.2])
+                    with col_chk:
+                        # Use a unique key for each checkbox (one per occurrence for recurring chores)
+                        is_done = st.checkbox("", value=item['done'], key=f"chk_{task['id']}_{item['date']}")
+                        if is_done != item['done']:
+                            if task['rrule']:
+                                task_store.set_occurrence_done(user, task['id'], item['date'], is_done)
+                            else:
+                                task_store.set_done(user, task['id'], is_done)
+                            item['done'] = is_done
+                            # Optional: trigger rerun to strike-through immediately
+                    with col_text:
+                        if item['done']:
+                            st.markdown(f"~~{task['desc']}~~ *(assigned to {task['assignee']})*")
+                        else:
+                            st.markdown(f"**{task['desc']}** *(assigned to {task['assignee']})*")
+                    with col_tag:
+                        st.caption(f"[{task['frequency']}]")
+
+# --- TAB 2: JOURNALING ---
+JOURNAL_PAGE_SIZE = 10
+
+@st.fragment
+def journal_tab(user):
+    st.header("Mindful Journaling")
+    st.markdown("Writing helps process emotions and promotes structural changes in the brain's emotional centers.")
+    
+    with st.form("journal_form"):
+        journal_entry = st.text_area("How are you feeling today?", height=150, placeholder="Take a deep breath and write...")
+        save_journal = st.form_submit_button("Save Entry")
+        if save_journal and journal_entry:
+            db.add_journal(user, journal_entry, datetime.datetime.now())
+            st.session_state.journal_cursors = []
+            st.success("Journal saved! 🌿")
+            
+    st.markdown("---")
+    st.subheader("Search Your Journal")
+    col_query, col_dates = st.columns([2, 1])
+    with col_query:
+        journal_query = st.text_input("Search entries", placeholder="e.g. sleep, calm, work")
+    with col_dates:
+        journal_dates = st.date_input("Written between", value=())
+    if journal_query:
+        # Ranked full-text search, optionally limited to a date range
+        search_start = journal_dates[0] if len(journal_dates) > 0 else None
+        search_end = journal_dates[1] if len(journal_dates) > 1 else search_start
+        results = db.search_journals(user, journal_query, search_start, search_end)
+        if not results:
+            st.info("No entries match that search.")
+        for result in results:
+            st.markdown(f"📝 **{format_entry_date(result['created'])}** — {result['snippet']}")
+
+    st.markdown("---")
+    st.subheader("Past Entries")
+    if 'journal_cursors' not in st.session_state:
+        # Stack of (created, id) cursors, one per older page of past journal entries
+        st.session_state.journal_cursors = []
+    # Only dates and titles for one page are loaded; a body is fetched when its entry is opened
+    cursors = st.session_state.journal_cursors
+    journals = db.list_journal_headers(user, before=cursors[-1] if cursors else None, limit=JOURNAL_PAGE_SIZE + 1)
+    has_older = len(journals) > JOURNAL_PAGE_SIZE
+    journals = journals[:JOURNAL_PAGE_SIZE]
+    if not journals:
+        st.info("Your journal entries will appear here.")
     else:
-        return "Thank you for sharing that with me. What specific thought crossed your mind just before you started feeling this way?"
+        for entry in journals:
+            if st.toggle(f"📝 {format_entry_date(entry['created'])} — {entry['title']}", key=f"journal_{entry['id']}"):
+                st.write(db.get_journal(user, entry['id']))
+
+        col_newer, col_older = st.columns(2)
+        with col_newer:
+            if cursors and st.button("← Newer entries"):
+                cursors.pop()
+                rerun_tab()
+        with col_older:
+            if has_older and st.button("Older entries →"):
+                last = journals[-1]
+                cursors.append((last['created'], last['id']))
+                rerun_tab()
+
+# --- TAB 3: CBT CHATBOT ---
+@st.fragment
+def cbt_tab(user):
+    st.header("CBT Support Chatbot")
+    st.markdown("This chatbot uses Cognitive Behavioral Therapy principles to help you reframe stressful thoughts. *(Note: This is a supportive tool, not a replacement for professional therapy).*")
+    
+    # Display only the most recent window of the chat history
+    if 'chat_window' not in st.session_state:
+        st.session_state.chat_window = CHAT_WINDOW
+    chat_window = st.session_state.chat_window
+    recent_chat = db.list_chat(user, limit=chat_window + 1)
+    if len(recent_chat) > chat_window:
+        recent_chat = recent_chat[1:]
+        if st.button("Show earlier messages"):
+            st.session_state.chat_window += CHAT_WINDOW
+            rerun_tab()
+    for msg in recent_chat:
+        with st.chat_message(msg["role"]):
+            st.write(msg["content"])
+            
+    # Chat Input
+    user_input = st.chat_input("Tell me what's on your mind...")
+    if user_input:
+        # Add user message and fold it into the rolling summary the backend sees
+        db.add_chat(user, "user", user_input)
+        chat_summary = update_summary(db.get_chat_summary(user), user_input)
+        db.set_chat_summary(user, chat_summary)
+        with st.chat_message("user"):
+            st.write(user_input)
+            
+        # Stream the bot response token by token, then store the full text
+        with st.chat_message("assistant"):
+            bot_response = st.write_stream(response_cache.stream(user_input, chat_pool, chat_summary))
+        db.add_chat(user, "assistant", bot_response)
+    
+    if st.button("Clear Chat History"):
+        db.clear_chat(user)
+        st.session_state.chat_window = CHAT_WINDOW
+        rerun_tab()
+
+    # Counters of the reply cache shared by every session
+    cache_stats = response_cache.stats()
+    st.caption(f"Reply cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+               f"({cache_stats['hit_rate']:.0%} hit rate), {cache_stats['size']} replies cached")
+
+# --- MOOD TRENDS ---
+@st.fragment
+def mood_tab(user):
+    st.header("Mood Trends")
+    st.markdown("How your journal entries and chatbot check-ins have felt over the last 90 days.")
+
+    # Score only what was written since the last visit, then read the stored scores
+    mood_pipeline.update(user)
+    daily = mood_pipeline.daily_trends(user)
+    if not daily["entries"].any():
+        st.info("Write a journal entry or chat with the CBT bot to start seeing your trends.")
+        return
+
+    streaks = mood_pipeline.streaks(daily)
+    recent = daily.tail(7)
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Check-in streak", f"{streaks['writing']} days",
+                help="Days in a row with a journal entry or a chat message")
+    col2.metric("Calm streak", f"{streaks['calm']} days")
+    col3.metric("Stress words this week", int(recent["stress_hits"].sum()))
+
+    st.subheader("Sentiment")
+    st.line_chart(daily[["sentiment", "sentiment_7d"]].rename(
+        columns={"sentiment": "Daily", "sentiment_7d": "7-day average"}
+    ))
+    st.subheader("Stress keywords")
+    st.bar_chart(daily["stress_hits"].rename("Stress words"))
+
+# --- TAB 4: SCHEDULING ---
+@st.fragment
+def schedule_tab(user):
+    st.header("Centralized Scheduling")
+    st.markdown("""
+    Integrating your family schedule reduces the mental energy spent on planning. 
+    Import calendars as `.ics` files and see them next to your family's chores - everything is stored locally.
+    """)
+
+    col1, col2 = st.columns([1, 1])
+    with col1:
+        view = st.radio("View", ["Week", "Month"], horizontal=True, key="calendar_view")
+    with col2:
+        anchor = st.date_input("Showing", key="calendar_anchor")
+
+    # Linked calendars older than the sync interval refresh in the background;
+    # new events show up on a later rerun
+    calendar_sync.refresh_due(user)
+
+    # Only events overlapping the visible grid are looked up
+    start, end = calendar_window(view, anchor)
+    events = event_store.between(
+        user, datetime.datetime.combine(start, datetime.time()), datetime.datetime.combine(end, datetime.time())
+    )
+    tasks = task_store.agenda(user, start, end - datetime.timedelta(days=1))
+    st.markdown(
+        calendar_html(start, end, events, tasks, month=anchor.month if view == "Month" else None),
+        unsafe_allow_html=True,
+    )
+
+    with st.expander("Add a calendar"):
+        st.markdown("""
+        Export a calendar as an `.ics` file (in Google Calendar: Settings > Import & export > Export) and upload it here.
+        Re-importing the same calendar updates its events instead of duplicating them.
+        """)
+        with st.form("ics_import", clear_on_submit=True):
+            calendar_name = st.text_input("Calendar name", value="Family")
+            ics_file = st.file_uploader("Calendar file", type=["ics"])
+            if st.form_submit_button("Import") and ics_file and calendar_name:
+                # Stream the upload line by line instead of reading it whole
+                count = event_store.import_ics(user, calendar_name, io.TextIOWrapper(ics_file, encoding="utf-8", errors="replace"))
+                st.session_state.flash = f"Imported {count} events into {calendar_name}."
+                st.rerun()
+
+        with st.form("ics_link", clear_on_submit=True):
+            st.markdown("Or link a calendar's secret iCal address to keep it in sync automatically.")
+            link_name = st.text_input("Calendar name", value="School")
+            link_url = st.text_input("iCal URL", placeholder="https://... or webcal://...")
+            if st.form_submit_button("Link") and link_name and link_url:
+                try:
+                    calendar_sync.link(user, link_name, link_url.strip())
+                except ValueError as exc:
+                    st.error(f"Couldn't link that calendar: {exc}")
+                else:
+                    st.session_state.flash = f"Linked {link_name} - its events will appear shortly."
+                    st.rerun()
+
+        feeds = {feed['calendar']: feed for feed in db.list_feeds(user)}
+        calendars = db.list_calendars(user)
+        calendars += [name for name in feeds if name not in calendars]  # linked, not synced yet
+        for calendar_name in calendars:
+            col_a, col_b = st.columns([3, 1])
+            feed = feeds.get(calendar_name)
+            status = f" - synced {feed['last_synced'][:16].replace('T', ' ')} ({feed['last_status']})" if feed and feed['last_synced'] else ""
+            col_a.markdown(f"📅 {calendar_name}{status}")
+            if col_b.button("Remove", key=f"remove_calendar_{calendar_name}"):
+                event_store.remove_calendar(user, calendar_name)
+                rerun_tab()
+
+# --- TAB 5: MINI GAMES ---
+def record_sudoku_edits(editor_key):
+    """on_change of the Sudoku editor: fold its edits into the player's entries.
+
+    The entries live in ``st.session_state.sudoku``, not only in the editor's
+    widget state, so they survive switching games or sections (Streamlit
+    drops a widget's state when a full run doesn't draw it) and are stashed
+    with the puzzle.
+    """
+    game = st.session_state.sudoku
+    cells = list(game["entries"])
+    for row, changes in st.session_state[editor_key]["edited_rows"].items():
+        for column, value in changes.items():
+            i = int(row) * 9 + int(column) - 1
+            if game["puzzle"][i] != "0":
+                game["given_edited"] = True
+            else:
+                cells[i] = "0" if value is None or pd.isna(value) else str(int(value))
+    game["entries"] = "".join(cells)
+
+@st.fragment
+def games_tab(user):
+    st.header("Brain Training Games")
+    st.markdown("Engaging in novel tasks like puzzles stimulates neurogenesis (the creation of new neurons). Take a 5-minute break!")
+    
+    game_choice = st.radio("Choose a game to play:", ["Sudoku", "2048 (Logic Puzzle)"], horizontal=True)
+    
+    if game_choice == "Sudoku":
+        puzzle_bank.refill()  # the bank starts filling on the first visit
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            difficulty = st.selectbox("Difficulty", list(DIFFICULTY_CLUES), index=1, key="sudoku_difficulty")
+        with col2:
+            st.write("")
+            new_puzzle = st.button("New puzzle")
+        if 'sudoku' not in st.session_state:
+            # Pick up a puzzle parked while another section was open
+            st.session_state.sudoku = session_memory.restore(user, 'sudoku')
+        if new_puzzle or st.session_state.sudoku is None:
+            puzzle, solution = puzzle_bank.pop(difficulty)
+            st.session_state.sudoku = {"puzzle": puzzle, "solution": solution, "entries": puzzle}
+        game = st.session_state.sudoku
+        game.setdefault("entries", game["puzzle"])  # stashed before entries were kept
+        entries = game["entries"]
+
+        # The editor starts from the player's entries; record_sudoku_edits keeps them up to date
+        grid = pd.DataFrame(
+            [[int(ch) or None for ch in entries[r * 9:r * 9 + 9]] for r in range(9)],
+            columns=[str(c + 1) for c in range(9)],
+        )
+        editor_key = f"sudoku_{game['puzzle']}"
+        st.data_editor(
+            grid, key=editor_key, hide_index=True, num_rows="fixed",
+            on_change=record_sudoku_edits, args=(editor_key,),
+            column_config={
+                column: st.column_config.NumberColumn(column, min_value=1, max_value=9, step=1)
+                for column in grid.columns
+            },
+        )
+        if game.pop("given_edited", False):
+            st.warning("The starting numbers can't be changed - your edits to them are ignored.")
+        if entries == game["solution"]:
+            st.success("Solved! 🎉 Your brain just got a great workout.")
+        elif clashing := conflicts(entries):
+            st.error(f"{len(clashing)} cells clash with another number in their row, column or box.")
+        else:
+            st.caption(f"{81 - entries.count('0')} of 81 cells filled.")
+
+    elif game_choice == "2048 (Logic Puzzle)":
+        if 'game_2048' not in st.session_state:
+            st.session_state.game_2048 = session_memory.restore(user, 'game_2048') or {"board": new_board(), "score": 0}
+        game = st.session_state.game_2048
+
+        # Apply the move before drawing so the board reflects this click
+        cols = st.columns(5)
+        for col, (label, direction) in zip(cols, [("⬅️", LEFT), ("⬆️", UP), ("⬇️", DOWN), ("➡️", RIGHT)]):
+            if col.button(label, key=f"move_{direction}"):
+                board, points = move(game["board"], direction)
+                if board != game["board"]:
+                    game["board"] = add_tile(board)
+                    game["score"] += points
+        if cols[4].button("New game"):
+            game["board"], game["score"] = new_board(), 0
+
+        st.metric("Score", game["score"])
+        st.markdown(board_html(game["board"]), unsafe_allow_html=True)
+        if not can_move(game["board"]):
+            st.error("No moves left - start a new game!")
+
+# --- TAB 6: NETWORKING FEED ---
+@st.fragment
+def network_tab(user):
+    st.header("Momenta Network")
+    st.markdown("Connect, share, and validate experiences with other busy moms. A strong social support system is scientifically proven to lower cortisol (stress hormone) levels.")
+    
+    # Post input
+    with st.form("post_form"):
+        new_post = st.text_area("Share a thought, a win, or a struggle...", placeholder="What's on your mind?")
+        submit_post = st.form_submit_button("Post to Community")
+        if submit_post and new_post:
+            feed.publish(user, new_post, datetime.datetime.now())
+            st.success("Posted!")
+            rerun_tab()
+            
+    st.markdown("---")
+    
+    if 'feed_view' not in st.session_state:
+        # This session's newest-first copy of the feed and the last post ID it has seen
+        st.session_state.feed_view = collections.deque(maxlen=feed.capacity)
+        st.session_state.feed_last_id = 0
+        st.session_state.feed_visible = FEED_PAGE_SIZE
+
+    # Pull only the posts published since this session last looked
+    new_posts = feed.since(st.session_state.feed_last_id)
+    if new_posts:
+        st.session_state.feed_view.extendleft(new_posts)
+        st.session_state.feed_last_id = new_posts[-1]["id"]
+
+    # Visible page: the live head of the feed, topped up from older pages by cursor
+    visible_count = st.session_state.feed_visible
+    visible_posts = list(itertools.islice(st.session_state.feed_view, visible_count))
+    if len(visible_posts) < visible_count:
+        cursor = visible_posts[-1]["id"] if visible_posts else None
+        visible_posts.extend(feed.page(cursor, visible_count - len(visible_posts)))
+
+    # Feed Display - one batched HTML block of cached cards, with the post times filled in now
+    st.markdown(feed.render(visible_posts), unsafe_allow_html=True)
+
+    if len(visible_posts) == visible_count:
+        if st.button(f"Load {FEED_PAGE_SIZE} more"):
+            st.session_state.feed_visible += FEED_PAGE_SIZE
+            rerun_tab()
+
+# Navigation label -> tab fragment, in display order
+DASHBOARD_SECTIONS = {
+    "👨‍👩‍👧 Family Manager": family_tab,
+    "📔 Journaling": journal_tab,
+    "🤖 CBT Chatbot": cbt_tab,
+    "📈 Mood Trends": mood_tab,
+    "📅 Scheduling": schedule_tab,
+    "🧩 Brain Games": games_tab,
+    "🌐 Momenta Network": network_tab,
+}
 
 # ==========================================
 # MAIN APPLICATION LOGIC
 # ==========================================
 
-st.markdown("<h1 style='text-align: center; font-size: 4rem;'>Your mind deserves <span class='gradient-text'>a moment</span></h1>", unsafe_allow_html=True)
+if 'flash' in st.session_state:
+    st.toast(st.session_state.pop('flash'), icon="🌿")
+
+st.markdown("<h1 class='hero-title'>Your mind deserves <span class='gradient-text'>a moment</span></h1>", unsafe_allow_html=True)
 st.markdown("""
     <p class='catchphrase'>
         Built for busy moms. Backed by brain science.<br>
-        <span style='font-size: 1.1rem; color: #94A3B8;'>Momenta helps you manage stress, build healthy habits, and nurture your family.</span>
+        <span class='catchphrase-sub'>Momenta helps you manage stress, build healthy habits, and nurture your family.</span>
     </p>
 """, unsafe_allow_html=True)
 
@@ -216,6 +668,7 @@ if not st.session_state.logged_in:
     # ------------------------------------------
     # HOME PAGE (Logged Out)
     # ------------------------------------------
+    session_memory.enforce(st.session_state.session_id, None, st.session_state, SESSION_STATE_KEYS)
     
     col1, col2 = st.columns([1.5, 1])
     
@@ -235,7 +688,7 @@ if not st.session_state.logged_in:
         """, unsafe_allow_html=True)
         
         # Placeholder for an inviting image
-        st.markdown("<div style='text-align:center; font-size: 5rem;'>🌱 🧠 🧘‍♀️</div>", unsafe_allow_html=True)
+        st.markdown("<div class='hero-emoji'>🌱 🧠 🧘‍♀️</div>", unsafe_allow_html=True)
 
     with col2:
         st.markdown("### Get Started")
@@ -261,6 +714,8 @@ else:
     # ------------------------------------------
     # DASHBOARD (Logged In)
     # ------------------------------------------
+    user = st.session_state.current_user
+
     st.sidebar.markdown(f"### Welcome, {st.session_state.current_user}!")
     if st.sidebar.button("Log Out"):
         logout()
@@ -268,215 +723,18 @@ else:
     st.sidebar.markdown("---")
     st.sidebar.info("💡 **Daily Brain Tip:** Hydration is key for neuroplasticity. Drink a glass of water right now!")
 
-    # Dashboard Tabs
-    tab_family, tab_journal, tab_cbt, tab_schedule, tab_games, tab_network = st.tabs([
-        "👨‍👩‍👧 Family Manager", 
-        "📔 Journaling", 
-        "🤖 CBT Chatbot", 
-        "📅 Scheduling", 
-        "🧩 Brain Games", 
-        "🌐 Momenta Network"
-    ])
-
-    # --- TAB 1: FAMILY MANAGER ---
-    with tab_family:
-        st.header("Family Manager & Mental Offloading")
-        st.markdown("Offload your mental to-do list here to reduce cognitive overload.")
-        
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.subheader("Add Family Member")
-            with st.form("add_member_form"):
-                member_name = st.text_input("Name")
-                member_desig = st.selectbox("Designation", ["Child", "Spouse", "Self", "Pet", "Other"])
-                add_mem = st.form_submit_button("Add Member")
-                if add_mem and member_name:
-                    st.session_state.family_members.append({"name": member_name, "designation": member_desig})
-                    st.rerun()
-                    
-            st.markdown("**Current Members:**")
-            for m in st.session_state.family_members:
-                st.markdown(f"- **{m['name']}** ({m['designation']})")
-
-        with col2:
-            st.subheader("Assign Tasks")
-            if not st.session_state.family_members:
-                st.info("Add a family member on the left to start assigning tasks.")
-            else:
-                with st.form("add_task_form"):
-                    task_desc = st.text_input("Task Description (e.g., Pack lunch, Sign permission slip)")
-                    assignee = st.selectbox("Assign To", [m['name'] for m in st.session_state.family_members])
-                    frequency = st.selectbox("Frequency", ["Daily", "Weekly", "Monthly", "One-time"])
-                    add_task = st.form_submit_button("Add Task")
-                    if add_task and task_desc:
-                        st.session_state.tasks.append({
-                            "id": str(time.time()),
-                            "desc": task_desc, 
-                            "assignee": assignee, 
-                            "frequency": frequency,
-                            "done": False
-                        })
-                        st.rerun()
-                
-                st.markdown("### To-Do List")
-                if not st.session_state.tasks:
-                    st.write("No tasks assigned yet. You're all caught up!")
-                else:
-                    for task in st.session_state.tasks:
-                        col_chk, col_text, col_tag = st.columns([0.1, 0.7, 0.2])
-                        with col_chk:
-                            # Use a unique key for each checkbox
-                            is_done = st.checkbox("", value=task['done'], key=f"chk_{task['id']}")
-                            if is_done != task['done']:
-                                task['done'] = is_done
-                                # Optional: trigger rerun to strike-through immediately
-                        with col_text:
-                            if task['done']:
-                                st.markdown(f"~~{task['desc']}~~ *(assigned to {task['assignee']})*")
-                            else:
-                                st.markdown(f"**{task['desc']}** *(assigned to {task['assignee']})*")
-                        with col_tag:
-                            st.caption(f"[{task['frequency']}]")
-
-    # --- TAB 2: JOURNALING ---
-    with tab_journal:
-        st.header("Mindful Journaling")
-        st.markdown("Writing helps process emotions and promotes structural changes in the brain's emotional centers.")
-        
-        with st.form("journal_form"):
-            journal_entry = st.text_area("How are you feeling today?", height=150, placeholder="Take a deep breath and write...")
-            save_journal = st.form_submit_button("Save Entry")
-            if save_journal and journal_entry:
-                st.session_state.journals.insert(0, {
-                    "date": datetime.datetime.now().strftime("%B %d, %Y - %I:%M %p"),
-                    "content": journal_entry
-                })
-                st.success("Journal saved! 🌿")
-                
-        st.markdown("---")
-        st.subheader("Past Entries")
-        if not st.session_state.journals:
-            st.info("Your journal entries will appear here.")
-        else:
-            for entry in st.session_state.journals:
-                with st.expander(f"📝 {entry['date']}"):
-                    st.write(entry['content'])
-
-    # --- TAB 3: CBT CHATBOT ---
-    with tab_cbt:
-        st.header("CBT Support Chatbot")
-        st.markdown("This chatbot uses Cognitive Behavioral Therapy principles to help you reframe stressful thoughts. *(Note: This is a supportive tool, not a replacement for professional therapy).*")
-        
-        # Display chat history
-        for msg in st.session_state.chat_history:
-            with st.chat_message(msg["role"]):
-                st.write(msg["content"])
-                
-        # Chat Input
-        user_input = st.chat_input("Tell me what's on your mind...")
-        if user_input:
-            # Add user message
-            st.session_state.chat_history.append({"role": "user", "content": user_input})
-            with st.chat_message("user"):
-                st.write(user_input)
-                
-            # Generate and add bot response
-            with st.spinner("Thinking..."):
-                time.sleep(1) # Simulate thought process
-                bot_response = simple_cbt_bot(user_input)
-                
-            st.session_state.chat_history.append({"role": "assistant", "content": bot_response})
-            with st.chat_message("assistant"):
-                st.write(bot_response)
-        
-        if st.button("Clear Chat History"):
-            st.session_state.chat_history = []
-            st.rerun()
-
-    # --- TAB 4: SCHEDULING ---
-    with tab_schedule:
-        st.header("Centralized Scheduling")
-        st.markdown("""
-        Integrating your family schedule reduces the mental energy spent on planning. 
-        Below is a demonstration of an embedded Google Calendar. 
-        """)
-        
-        # Displaying a public Google Calendar as an example via Iframe
-        st.components.v1.iframe(
-            src="https://calendar.google.com/calendar/embed?src=en.usa%23holiday%40group.v.calendar.google.com&ctz=America%2FNew_York",
-            width=800,
-            height=600,
-            scrolling=True
-        )
-        
-        with st.expander("How to link YOUR Google Calendar"):
-            st.markdown("""
-            To display your personal or family calendar here:
-            1. Open Google Calendar on a computer.
-            2. Go to Settings (gear icon) > Settings for my calendars.
-            3. Click your calendar, scroll down to "Integrate calendar".
-            4. Copy the "Embed code" (it starts with `<iframe src=...`).
-            5. In a fully deployed version of this app, you would paste that `src` link into the code!
-            """)
-
-    # --- TAB 5: MINI GAMES ---
-    with tab_games:
-        st.header("Brain Training Games")
-        st.markdown("Engaging in novel tasks like puzzles stimulates neurogenesis (the creation of new neurons). Take a 5-minute break!")
-        
-        game_choice = st.radio("Choose a game to play:", ["Sudoku", "2048 (Logic Puzzle)"], horizontal=True)
-        
-        if game_choice == "Sudoku":
-            st.components.v1.iframe(
-                src="https://sudoku.com/",
-                width=800,
-                height=600,
-                scrolling=True
-            )
-        elif game_choice == "2048 (Logic Puzzle)":
-            st.components.v1.iframe(
-                src="https://play2048.co/",
-                width=800,
-                height=600,
-                scrolling=True
-            )
-
-    # --- TAB 6: NETWORKING FEED ---
-    with tab_network:
-        st.header("Momenta Network")
-        st.markdown("Connect, share, and validate experiences with other busy moms. A strong social support system is scientifically proven to lower cortisol (stress hormone) levels.")
-        
-        # Post input
-        with st.form("post_form"):
-            new_post = st.text_area("Share a thought, a win, or a struggle...", placeholder="What's on your mind?")
-            submit_post = st.form_submit_button("Post to Community")
-            if submit_post and new_post:
-                st.session_state.community_posts.insert(0, {
-                    "user": st.session_state.current_user,
-                    "time": "Just now",
-                    "content": new_post
-                })
-                st.success("Posted!")
-                st.rerun()
-                
-        st.markdown("---")
-        
-        # Feed Display - Updated for Dark Mode
-        for post in st.session_state.community_posts:
-            st.markdown(f"""
-            <div style="background-color: #1E293B; padding: 15px; border-radius: 8px; border: 1px solid #334155; margin-bottom: 10px;">
-                <div style="color: #7BB08A; font-weight: bold; margin-bottom: 5px;">
-                    👤 {post['user']} <span style="color: #94A3B8; font-size: 0.8em; font-weight: normal;">• {post['time']}</span>
-                </div>
-                <div style="color: #FFFFFF; font-size: 1.05em;">
-                    {post['content']}
-                </div>
-                <div style="margin-top: 10px; font-size: 0.9em; color: #94A3B8;">
-                    💬 Reply &nbsp;&nbsp; ❤️ Like
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
+    # Dashboard navigation - only the selected section runs, so hidden tabs
+    # (and their iframes) are neither computed nor sent to the browser
+    section = st.radio(
+        "Section", list(DASHBOARD_SECTIONS), horizontal=True,
+        label_visibility="collapsed", key="dashboard_section"
+    )
+    st.markdown("---")
+    # Offload the state of every other section before drawing this one
+    cold = [key for name, keys in SECTION_STATE.items() if name != section for key in keys]
+    session_memory.enforce(st.session_state.session_id, user, st.session_state, cold, SECTION_STATE.get(section, ()))
+    DASHBOARD_SECTIONS[section](user)
+    session_memory.measure(st.session_state.session_id, user, st.session_state)
 
 # import streamlit as st
 # import datetime
@@ -0,0 +1,130 @@
+"""Password hashing and login sessions for Momenta.
+
+Passwords are stored as salted scrypt hashes (PBKDF2-SHA256 where the
+Python build lacks scrypt). A successful login hands out a random session
+token; tokens live in a small LRU so the expensive key derivation runs once
+per login rather than on every rerun.
+"""
+import base64
+import collections
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+
+# Cost parameters. Raising them makes new hashes slower to compute; existing
+# hashes keep their own parameters and are upgraded on the next login.
+SCRYPT_N = int(os.environ.get("MOMENTA_SCRYPT_N", 2 ** 14))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("MOMENTA_PBKDF2_ITERATIONS", 600_000))
+SALT_BYTES = 16
+
+TOKEN_CACHE_SIZE = 1024
+TOKEN_TTL = 12 * 60 * 60  # seconds
+
+HAS_SCRYPT = hasattr(hashlib, "scrypt")
+HASH_PREFIXES = ("scrypt$", "pbkdf2_sha256$")
+
+
+def _b64(raw):
+    return base64.b64encode(raw).decode("ascii")
+
+
+def hash_password(password):
+    """Encode ``password`` as ``scheme$params$salt$hash``."""
+    salt = os.urandom(SALT_BYTES)
+    if HAS_SCRYPT:
+        digest = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P)
+        return f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITERATIONS)
+    return f"pbkdf2_sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(digest)}"
+
+
+def is_hashed(encoded):
+    """True if ``encoded`` came from ``hash_password`` rather than being a plain password."""
+    return encoded.startswith(HASH_PREFIXES)
+
+
+def verify_password(password, encoded):
+    """Check ``password`` against a stored hash in constant time.
+
+    Anything that isn't a well-formed hash fails; plain passwords from
+    before hashing are hashed when the database is opened (see ``Storage``).
+    """
+    try:
+        scheme, params, salt, expected = encoded.split("$")
+        salt, expected = base64.b64decode(salt), base64.b64decode(expected)
+        if scheme == "scrypt":
+            n, r, p = (int(x) for x in params.split(","))
+            digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p)
+        elif scheme == "pbkdf2_sha256":
+            digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, int(params))
+        else:
+            raise ValueError(scheme)
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, expected)
+
+
+def needs_rehash(encoded):
+    """True if ``encoded`` uses another scheme or weaker parameters than today's."""
+    if HAS_SCRYPT:
+        return not encoded.startswith(f"scrypt${SCRYPT_N},{SCRYPT_R},{SCRYPT_P}$")
+    return not encoded.startswith(f"pbkdf2_sha256${PBKDF2_ITERATIONS}$")
+
+
+class CredentialStore:
+    """Registers users, verifies logins and tracks live session tokens.
+
+    Shared by every session in the process (see ``get_credentials`` in
+    ``app.py``).
+    """
+
+    def __init__(self, db, cache_size=TOKEN_CACHE_SIZE, ttl=TOKEN_TTL):
+        self.db = db
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tokens = collections.OrderedDict()  # token -> (username, expires_at)
+        # Verified against when the username is unknown, so a miss costs as
+        # much as a wrong password and does not leak which users exist.
+        self._dummy_hash = hash_password(secrets.token_hex(8))
+
+    def register(self, username, password):
+        """Create an account. Returns False if the username is taken."""
+        return self.db.add_user(username, hash_password(password))
+
+    def login(self, username, password):
+        """Verify a password and return a new session token, or None."""
+        stored = self.db.get_password(username)
+        if not verify_password(password, stored or self._dummy_hash) or stored is None:
+            return None
+        if needs_rehash(stored):
+            self.db.set_password(username, hash_password(password))
+
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._tokens[token] = (username, time.monotonic() + self.ttl)
+            while len(self._tokens) > self.cache_size:
+                self._tokens.popitem(last=False)
+        return token
+
+    def session_user(self, token):
+        """The username for a live token, or None if it expired or was evicted."""
+        with self._lock:
+            entry = self._tokens.get(token)
+            if entry is None:
+                return None
+            username, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._tokens[token]
+                return None
+            self._tokens.move_to_end(token)
+            return username
+
+    def logout(self, token):
+        with self._lock:
+            self._tokens.pop(token, None)
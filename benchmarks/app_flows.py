@@ -0,0 +1,350 @@
+"""Per-rerun cost of the main dashboard flows at growing data sizes.
+
+Drives ``app.py`` headlessly with ``AppTest`` through login, the Family
+Manager (add member, add task, tick a task), journaling, the chatbot, mood
+trends and the community feed. For every step it records the wall time of
+the rerun, the peak Python memory allocated during it, the number of
+elements the script emitted and the payload: the serialized size of the
+ForwardMsgs sent to the browser. Each data size runs in a fresh process
+against its own database, seeded with that many tasks, journal entries,
+chat messages and feed posts for ``demo_mom``. Run from the repository
+root:
+
+    python benchmarks/app_flows.py --sizes 0 100 1000
+
+AppTest always reruns the whole script, while a browser reruns only the
+fragment that holds the widget it interacted with. So when a step's widget
+was drawn inside a fragment, the step is run as a fragment-scoped rerun
+(see ``PayloadRecorder``, which relies on AppTest internals as of
+Streamlit 1.65). A full rerun that is not measured then brings back the
+rest of the page for the next step.
+
+``--rev`` measures the app as it was at another commit. Steps whose
+widgets don't exist in that version are skipped. For example, to compare
+the app before and after the dashboard tabs became fragments:
+
+    python benchmarks/app_flows.py --rev 1424a61^ --sizes 100
+    python benchmarks/app_flows.py --rev 1424a61 --sizes 100
+
+To catch regressions before a deploy, record a baseline once and compare
+later runs against it; the script exits non-zero when a step gets slower
+or heavier than the tolerance allows, or emits more elements than before:
+
+    python benchmarks/app_flows.py --save baseline.json
+    python benchmarks/app_flows.py --baseline baseline.json --tolerance 1.5
+"""
+import argparse
+import dataclasses
+import datetime
+import inspect
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+# Reruns this fast are dominated by noise, so they never count as regressions.
+MIN_REGRESSION_MS = 5.0
+
+
+def widget(elements, label):
+    return next((e for e in elements if e.label == label), None)
+
+
+def export(rev):
+    """Extract the tree at git revision ``rev`` into a temporary directory."""
+    archive = subprocess.run(["git", "-C", ROOT, "archive", rev], capture_output=True, check=True).stdout
+    target = tempfile.mkdtemp()
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+class PayloadRecorder:
+    """Records the ForwardMsg bytes of every AppTest run and can scope a run to one fragment.
+
+    It also remembers which fragment drew each widget, taken from the
+    ``fragment_id`` of the deltas that created it.
+    """
+
+    TRIGGERS = {"trigger_value", "string_trigger_value", "chat_input_value"}
+
+    def __init__(self):
+        from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+
+        self.bytes = 0
+        self.scope = None
+        self._fragment_of = {}
+        original = LocalScriptRunner.run
+        recorder = self
+
+        def run(runner, *args, **kwargs):
+            if recorder.scope is not None:
+                # The runner merges a full rerun into its queue; queue a fragment-only one instead
+                scope = recorder.scope
+                runner.request_rerun = lambda data: setattr(
+                    runner._requests, "_rerun_data", dataclasses.replace(data, fragment_id_queue=[scope])
+                )
+            tree = original(runner, *args, **kwargs)
+            recorder.record(runner.forward_msgs())
+            return tree
+
+        LocalScriptRunner.run = run
+
+    def record(self, messages):
+        self.bytes = sum(message.ByteSize() for message in messages)
+        for message in messages:
+            if message.WhichOneof("type") == "delta" and message.delta.WhichOneof("type") == "new_element":
+                element = message.delta.new_element
+                widget_id = getattr(getattr(element, element.WhichOneof("type")), "id", "")
+                if widget_id:
+                    self._fragment_of[widget_id] = message.delta.fragment_id or None
+
+    def rerun(self, at, element):
+        """Rerun for an interaction with ``element``.
+
+        Returns the page's widget states if the rerun was scoped to a
+        fragment (pass them to ``resync``), otherwise None.
+        """
+        fragment = self._fragment_of.get(getattr(element, "id", None))
+        if fragment is None:
+            at.run()
+            return None
+        states = at._tree.get_widget_states()
+        self.scope = fragment
+        try:
+            at.run()
+        finally:
+            self.scope = None
+        return states
+
+    def resync(self, at, states):
+        """Full rerun with the page's widget states, minus the clicks already handled."""
+        from streamlit.proto.WidgetStates_pb2 import WidgetStates
+
+        kept = [state for state in states.widgets if state.WhichOneof("value") not in self.TRIGGERS]
+        at._run(WidgetStates(widgets=kept))
+
+
+def count_elements(node):
+    children = getattr(node, "children", None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def seed(size):
+    """Fill the (fresh) database with ``size`` rows of each kind for demo_mom."""
+    from storage import Storage
+
+    db = Storage()
+    now = datetime.datetime.now()
+    members = ["Ava", "Ben", "Cleo", "Dad"]
+    for name in members:
+        db.add_member("demo_mom", name, "Child")
+    frequencies = [("Daily", "FREQ=DAILY"), ("Weekly", "FREQ=WEEKLY"), ("One-time", None)]
+    # Older versions stored preformatted date strings instead of ``created``
+    legacy_journal = "date" in inspect.signature(db.add_journal).parameters
+    legacy_post = "time" in inspect.signature(db.add_post).parameters
+    for i in range(size):
+        frequency, rrule = frequencies[i % len(frequencies)]
+        db.add_task("demo_mom", f"Chore {i}", members[i % len(members)], frequency, now.date(), rrule)
+        created = now - datetime.timedelta(hours=i)
+        content = f"Entry {i}: busy day, a little tired but grateful"
+        if legacy_journal:
+            db.add_journal("demo_mom", created.strftime("%B %d, %Y - %I:%M %p"), content)
+        else:
+            db.add_journal("demo_mom", content, created)
+        db.add_chat("demo_mom", "user" if i % 2 == 0 else "assistant", f"message {i}")
+        if legacy_post:
+            db.add_post(f"mom_{i % 50}", "Earlier", f"Post {i}: small wins today")
+        else:
+            db.add_post(f"mom_{i % 50}", f"Post {i}: small wins today", created)
+
+
+def steps():
+    """``(name, action)`` pairs. Each action sets up one interaction and returns
+    the widget it used, or None when this version of the app doesn't have it.
+    """
+    def navigate(label):
+        def action(at):
+            # Older versions draw every tab at once; switching tabs costs no rerun there
+            sections = [radio for radio in at.radio if radio.key == "dashboard_section"]
+            if not sections or label not in sections[0].options:
+                return None
+            return sections[0].set_value(label)
+        return action
+
+    def add_member(at):
+        widget(at.text_input, "Name").input(f"Kid {time.perf_counter_ns()}")
+        return widget(at.button, "Add Member").click()
+
+    def add_task(at):
+        widget(at.text_input, "Task Description (e.g., Pack lunch, Sign permission slip)").input("Pack lunch")
+        widget(at.selectbox, "Frequency").select("Daily")
+        return widget(at.button, "Add Task").click()
+
+    def toggle_task(at):
+        box = at.checkbox[0]
+        return box.set_value(not box.value)
+
+    def save_journal(at):
+        widget(at.text_area, "How are you feeling today?").input("Slept badly, feeling tired")
+        return widget(at.button, "Save Entry").click()
+
+    def chat(at):
+        return at.chat_input[0].set_value("I'm so stressed about the kids")
+
+    def post(at):
+        widget(at.text_area, "Share a thought, a win, or a struggle...").input("Small win today")
+        return widget(at.button, "Post to Community").click()
+
+    return [
+        ("open family", navigate("👨‍👩‍👧 Family Manager")),
+        ("add member", add_member),
+        ("add task", add_task),
+        ("toggle task", toggle_task),
+        ("open journal", navigate("📔 Journaling")),
+        ("save journal", save_journal),
+        ("open chatbot", navigate("🤖 CBT Chatbot")),
+        ("chat", chat),
+        ("open mood", navigate("📈 Mood Trends")),
+        ("open feed", navigate("🌐 Momenta Network")),
+        ("post", post),
+    ]
+
+
+def run_size(size, repeat):
+    """Measure every step at one data size. Runs inside a worker process."""
+    from streamlit.testing.v1 import AppTest
+
+    seed(size)
+    recorder = PayloadRecorder()
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+
+    def login(at):
+        widget(at.text_input, "Username").input("demo_mom")
+        widget(at.text_input, "Password").input("password123")
+        return widget(at.button, "Log In").click()
+
+    results = {}
+    for name, action in [("login", login)] + steps():
+        times, peaks, payloads = [], [], []
+        passes = 1 if name == "login" else repeat + 1
+        for i in range(passes):
+            element = action(at)
+            if element is None:
+                break
+            # Memory is traced on the first pass only; tracing slows the rerun
+            # down, so that pass is not a timing sample unless it is the only one.
+            traced = i == 0
+            if traced:
+                tracemalloc.start()
+            start = time.perf_counter()
+            scoped = recorder.rerun(at, element)
+            elapsed = (time.perf_counter() - start) * 1000
+            if traced:
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+                tracemalloc.stop()
+            if not traced or passes == 1:
+                times.append(elapsed)
+            payloads.append(recorder.bytes)
+            elements = count_elements(at._tree)
+            if at.exception:
+                raise RuntimeError(f"{name}: {at.exception}")
+            if scoped is not None:
+                recorder.resync(at, scoped)
+        if not times:
+            continue  # not in this version of the app
+        results[name] = {
+            "ms": statistics.median(times),
+            "peak_kb": max(peaks),
+            "elements": elements,
+            "payload_kb": statistics.median(payloads) / 1024,
+            "fragment": scoped is not None,
+        }
+    return results
+
+
+def measure(size, repeat, root):
+    """Run one data size in a fresh process with its own database."""
+    env = dict(os.environ, MOMENTA_DB=os.path.join(tempfile.mkdtemp(), "bench.db"))
+    env.setdefault("MOMENTA_SCRYPT_N", "1024")  # keep login cost out of the way
+    proc = subprocess.run(
+        [sys.executable, __file__, "--worker", str(size), "--repeat", str(repeat), "--root", root],
+        env=env, capture_output=True, text=True,
+    )
+    if proc.returncode:
+        sys.exit(f"size {size} failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def regressions(report, baseline, tolerance):
+    problems = []
+    for size, results in report.items():
+        for name, now in results.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            if now["ms"] > max(before["ms"] * tolerance, MIN_REGRESSION_MS):
+                problems.append(f"size {size} {name}: {before['ms']:.1f} -> {now['ms']:.1f} ms")
+            if now["peak_kb"] > before["peak_kb"] * tolerance:
+                problems.append(f"size {size} {name}: peak {before['peak_kb']:.0f} -> {now['peak_kb']:.0f} KB")
+            if now["elements"] > before["elements"]:
+                problems.append(f"size {size} {name}: {before['elements']} -> {now['elements']} elements")
+            if "payload_kb" in before and now["payload_kb"] > before["payload_kb"] * tolerance:
+                problems.append(f"size {size} {name}: payload {before['payload_kb']:.1f} -> {now['payload_kb']:.1f} KB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[0, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5, help="timed reruns per step")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--rev", help="git revision of the app to measure (default: the working tree)")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--root", default=ROOT, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        global APP
+        APP = os.path.join(args.root, "app.py")
+        sys.path.insert(0, args.root)
+        print(json.dumps(run_size(args.worker, args.repeat)))
+        return
+
+    root = export(args.rev) if args.rev else ROOT
+    report = {}
+    print(f"{'size':>6}  {'step':<13} {'ms/rerun':>9}  {'peak KB':>8}  {'elements':>8}  {'payload KB':>10}  rerun")
+    for size in args.sizes:
+        results = measure(size, args.repeat, root)
+        report[str(size)] = results
+        for name, r in results.items():
+            scope = "fragment" if r["fragment"] else "full"
+            print(f"{size:>6}  {name:<13} {r['ms']:>9.1f}  {r['peak_kb']:>8.0f}  {r['elements']:>8}"
+                  f"  {r['payload_kb']:>10.1f}  {scope}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = regressions(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print("REGRESSION", problem)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
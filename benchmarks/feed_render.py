@@ -0,0 +1,65 @@
+"""Cost of rendering a page of community feed cards.
+
+Compares building every card from an f-string on each rerun (the old
+``render_post_card``) with ``PostHTMLCache``, where cards are rendered once
+at publish time and a rerun is a lookup per post plus a join. Run from the
+repository root:
+
+    python benchmarks/feed_render.py
+"""
+import datetime
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feed import PostHTMLCache, render_post  # noqa: E402
+
+
+def legacy_render(post):
+    return f"""
+    <div style="background-color: #1E293B; padding: 15px; border-radius: 8px; border: 1px solid #334155; margin-bottom: 10px;">
+        <div style="color: #7BB08A; font-weight: bold; margin-bottom: 5px;">
+            👤 {post['user']} <span style="color: #94A3B8; font-size: 0.8em; font-weight: normal;">• {post['created']:%b %d}</span>
+        </div>
+        <div style="color: #FFFFFF; font-size: 1.05em;">
+            {post['content']}
+        </div>
+        <div style="margin-top: 10px; font-size: 0.9em; color: #94A3B8;">
+            💬 Reply &nbsp;&nbsp; ❤️ Like
+        </div>
+    </div>
+    """
+
+
+def make_posts(count, rng):
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 9))) for _ in range(500)]
+    return [
+        {"id": i, "user": f"mom_{rng.randint(1, 200)}", "created": datetime.datetime.now(),
+         "content": " ".join(rng.choices(words, k=rng.randint(10, 60))) + " <3 & thanks"}
+        for i in range(1, count + 1)
+    ]
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'posts':>6}  {'f-string ms':>12}  {'escaped ms':>11}  {'cached ms':>10}  {'KB old':>7}  {'KB new':>7}")
+    for size in (1000, 10000):
+        posts = make_posts(size, rng)
+        cache = PostHTMLCache(capacity=size)
+        for post in posts:
+            cache.add(post)
+        runs = 20
+        legacy = timeit.timeit(lambda: "".join(legacy_render(p) for p in posts), number=runs) / runs
+        fresh = timeit.timeit(lambda: "".join(render_post(p) for p in posts), number=runs) / runs
+        cached = timeit.timeit(lambda: cache.render(posts), number=runs) / runs
+        old_kb = len("".join(legacy_render(p) for p in posts).encode()) / 1024
+        new_kb = len(cache.render(posts).encode()) / 1024
+        print(f"{size:>6}  {legacy * 1e3:>12.2f}  {fresh * 1e3:>11.2f}  {cached * 1e3:>10.2f}  {old_kb:>7.0f}  {new_kb:>7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Incremental calendar sync against a local HTTP stand-in.
+
+Serves a generated .ics feed from ``http.server`` on localhost and syncs it
+with ``CalendarSync`` through four rounds: the first full download, an
+unchanged feed (answered with 304 via ETag), one edited event on a server
+that ignores conditional requests, and the same edit with conditional
+requests honoured. Prints bytes transferred, events parsed and sync time
+for each round. Run from the repository root:
+
+    python benchmarks/ics_sync.py --events 2000
+"""
+import argparse
+import datetime
+import hashlib
+import http.server
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calendar_sync import CalendarSync  # noqa: E402
+from events import EventStore  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+class Feed:
+    """The stand-in server's state: one calendar body and whether to honour ETags."""
+
+    def __init__(self, count):
+        start = datetime.datetime(2026, 1, 5, 9, 0)
+        self.events = [
+            (f"evt-{i}@example.com", f"Event {i}", start + datetime.timedelta(hours=7 * i))
+            for i in range(count)
+        ]
+        self.use_etag = True
+        self.render()
+
+    def render(self):
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//momenta//bench//EN"]
+        for uid, summary, when in self.events:
+            lines += [
+                "BEGIN:VEVENT", f"UID:{uid}", f"SUMMARY:{summary}",
+                f"DTSTART:{when:%Y%m%dT%H%M%S}", "DURATION:PT1H", "LOCATION:School gym",
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        self.body = ("\r\n".join(lines) + "\r\n").encode()
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:16] + '"'
+
+
+def make_handler(feed):
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if feed.use_etag and self.headers.get("If-None-Match") == feed.etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/calendar")
+            self.send_header("Content-Length", str(len(feed.body)))
+            if feed.use_etag:
+                self.send_header("ETag", feed.etag)
+            self.end_headers()
+            self.wfile.write(feed.body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    feed = Feed(args.events)
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), make_handler(feed))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/family.ics"
+
+    db = Storage(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    sync = CalendarSync(db, EventStore(db), allow_private=True)  # the stand-in server is on localhost
+
+    def edit_one():
+        uid, summary, when = feed.events[len(feed.events) // 2]
+        feed.events[len(feed.events) // 2] = (uid, summary + " (moved)", when + datetime.timedelta(hours=1))
+        feed.render()
+
+    rounds = [
+        ("first sync", lambda: None, True),
+        ("unchanged (304)", lambda: None, True),
+        ("1 edit, no ETag", edit_one, False),
+        ("1 edit, ETag", edit_one, True),
+    ]
+    print(f"{'round':<18} {'status':<13} {'bytes':>9} {'parsed':>7} {'upserted':>9} {'ms':>8}")
+    for name, change, use_etag in rounds:
+        change()
+        feed.use_etag = use_etag
+        future = sync.link("demo_mom", "School", url) if name == "first sync" else sync.submit("demo_mom", "School")
+        r = future.result()
+        if r["status"] == "error":
+            sys.exit(f"{name}: {r['error']}")
+        print(f"{name:<18} {r['status']:<13} {r['bytes']:>9} {r['parsed']:>7} {r['upserted']:>9} {r['seconds'] * 1000:>8.1f}")
+
+    assert len(db.list_events("demo_mom")) == args.events
+    stats = sync.stats()
+    print(f"\n{stats['syncs']} syncs, {stats['bytes']} bytes, mean {stats['mean_seconds'] * 1000:.1f} ms, "
+          f"max {stats['max_seconds'] * 1000:.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
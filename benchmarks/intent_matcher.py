@@ -0,0 +1,62 @@
+"""Intent classification cost as the rule set grows.
+
+Compares the compiled ``IntentMatcher`` with the old approach of one
+``any(word in msg ...)`` scan per intent, for rule sets padded out with
+synthetic triggers. Run from the repository root:
+
+    python benchmarks/intent_matcher.py
+"""
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import INTENTS, IntentMatcher  # noqa: E402
+
+MESSAGES = [
+    "I'm so stressed about work and the kids have a fever",
+    "honestly just exhausted, nobody in this house lets me sleep",
+    "feeling a bit down today, not sure why",
+    "we went to the park and it was lovely",
+]
+
+
+def padded_intents(total_triggers, rng):
+    """The real intents plus synthetic ones until there are ``total_triggers`` triggers."""
+    intents = [dict(intent) for intent in INTENTS]
+    count = sum(len(intent["triggers"]) for intent in intents)
+    n = 0
+    while count < total_triggers:
+        words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 10))) for _ in range(10)]
+        intents.append({"name": f"synthetic_{n}", "priority": 1, "triggers": words, "response": ""})
+        count += len(words)
+        n += 1
+    return intents
+
+
+def naive_classify(intents, message):
+    msg = message.lower()
+    for intent in intents:
+        if any(word in msg for word in intent["triggers"]):
+            return intent
+    return None
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'triggers':>8}  {'compiled us/msg':>16}  {'naive us/msg':>13}")
+    for size in (25, 100, 250, 500, 1000):
+        intents = padded_intents(size, rng)
+        matcher = IntentMatcher(intents)
+        runs = 2000
+        compiled = timeit.timeit(lambda: [matcher.classify(m) for m in MESSAGES], number=runs)
+        naive = timeit.timeit(lambda: [naive_classify(intents, m) for m in MESSAGES], number=runs)
+        per_msg = runs * len(MESSAGES) / 1e6
+        print(f"{size:>8}  {compiled / per_msg:>16.2f}  {naive / per_msg:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
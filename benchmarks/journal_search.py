@@ -0,0 +1,61 @@
+"""Journal search latency with tens of thousands of entries per user.
+
+Fills a temporary database with synthetic entries and times ranked
+full-text queries with and without a date range. Run from the repository
+root:
+
+    python benchmarks/journal_search.py --entries 50000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import Storage  # noqa: E402
+
+WORDS = (
+    "tired stressed calm walk kids work sleep coffee meeting grateful anxious school "
+    "dinner laundry husband run yoga breathe overwhelmed happy sad rain sunny park"
+).split()
+QUERIES = ["sleep", "walk kids", "overwhelm", "grateful yoga", "calm"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    db = Storage(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    start = datetime.datetime(2020, 1, 1)
+    with db._write() as conn:
+        conn.executemany(
+            "INSERT INTO journals (owner, content, created) VALUES (?, ?, ?)",
+            (
+                (
+                    "bench_mom",
+                    " ".join(rng.choices(WORDS, k=rng.randint(20, 80))),
+                    (start + datetime.timedelta(hours=i)).isoformat(),
+                )
+                for i in range(args.entries)
+            ),
+        )
+
+    last_month = (start + datetime.timedelta(hours=args.entries - 24 * 30)).date()
+    print(f"{args.entries} entries")
+    for query in QUERIES:
+        runs = 20
+        ranked = timeit.timeit(lambda: db.search_journals("bench_mom", query), number=runs) / runs
+        ranged = timeit.timeit(
+            lambda: db.search_journals("bench_mom", query, start=last_month), number=runs
+        ) / runs
+        print(f"  {query!r:<16} ranked {ranked * 1000:7.1f} ms   last 30 days {ranged * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
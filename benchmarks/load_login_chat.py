@@ -0,0 +1,91 @@
+"""Login and chat throughput for a single Streamlit worker.
+
+Drives ``app.py`` headlessly with ``AppTest`` and reports completed login
+and chat requests per second. Run from the repository root:
+
+    python benchmarks/load_login_chat.py --seconds 10
+
+To measure an older version of the app, export that commit and drive its
+``app.py`` instead. For example, before the blocking ``time.sleep(1)``
+calls were removed from login and chat:
+
+    python benchmarks/load_login_chat.py --rev e8a0654^
+"""
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+
+
+def widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+
+def export(rev):
+    """Extract the tree at git revision ``rev`` into a temporary directory."""
+    archive = subprocess.run(["git", "-C", ROOT, "archive", rev], capture_output=True, check=True).stdout
+    target = tempfile.mkdtemp()
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+def logged_in_app():
+    at = AppTest.from_file(APP, default_timeout=30)
+    at.run()
+    widget(at.text_input, "Username").input("demo_mom")
+    widget(at.text_input, "Password").input("password123")
+    widget(at.button, "Log In").click().run()
+    return at
+
+
+def measure(name, action, seconds):
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        action()
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{name:<6} {count:>6} requests in {elapsed:5.1f}s  ->  {count / elapsed:7.1f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--rev", help="git revision of the app to measure (default: the working tree)")
+    args = parser.parse_args()
+
+    global APP
+    root = export(args.rev) if args.rev else ROOT
+    APP = os.path.join(root, "app.py")
+    os.environ["MOMENTA_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    sys.path.insert(0, root)
+
+    measure("login", logged_in_app, args.seconds)
+
+    at = logged_in_app()
+    # Only the selected dashboard section runs, so open the chatbot first
+    # (older versions draw every tab and have no section radio)
+    if any(radio.key == "dashboard_section" for radio in at.radio):
+        at.radio(key="dashboard_section").set_value("🤖 CBT Chatbot").run()
+    messages = ["I'm so stressed", "so tired today", "the kids are fighting", "feeling down"]
+
+    def chat():
+        at.chat_input[0].set_value(messages[chat.turn % len(messages)]).run()
+        chat.turn += 1
+
+    chat.turn = 0
+    measure("chat", chat, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
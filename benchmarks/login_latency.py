@@ -0,0 +1,65 @@
+"""Login latency under concurrent sign-ins.
+
+Registers a batch of users, then logs them in from a thread pool and
+reports p50/p99 latency of ``CredentialStore.login`` plus the cost of the
+cached token check that every rerun pays instead. Run from the repository
+root:
+
+    python benchmarks/login_latency.py --users 200 --threads 8
+"""
+import argparse
+import concurrent.futures
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from auth import CredentialStore  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    db = Storage(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    creds = CredentialStore(db)
+    names = [f"bench_user_{i}" for i in range(args.users)]
+    for name in names:
+        creds.register(name, "password123")
+
+    def timed_login(name):
+        start = time.perf_counter()
+        token = creds.login(name, "password123")
+        return time.perf_counter() - start, token
+
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(args.threads) as pool:
+        results = list(pool.map(timed_login, names))
+    wall = time.perf_counter() - start
+
+    latencies = [elapsed * 1000 for elapsed, _ in results]
+    print(f"logins:  {len(latencies)} with {args.threads} threads in {wall:.2f}s ({len(latencies) / wall:.1f}/s)")
+    print(f"latency: p50 {percentile(latencies, 50):.1f} ms  p99 {percentile(latencies, 99):.1f} ms  "
+          f"mean {statistics.mean(latencies):.1f} ms")
+
+    tokens = [token for _, token in results]
+    start = time.perf_counter()
+    for token in tokens * 50:
+        creds.session_user(token)
+    per_check = (time.perf_counter() - start) / (len(tokens) * 50)
+    print(f"rerun token check: {per_check * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
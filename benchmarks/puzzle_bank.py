@@ -0,0 +1,63 @@
+"""Puzzle bank fill throughput and "New puzzle" latency.
+
+Fills an empty bank with ``PuzzleBank`` using 1..N concurrent batches and
+reports puzzles per second overall and per core (puzzles per worker
+CPU-second), then times popping puzzles from the full bank against
+generating them on the spot. Run from the repository root:
+
+    python benchmarks/puzzle_bank.py --size 40
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from games import DIFFICULTY_CLUES, generate_sudoku  # noqa: E402
+from puzzles import PUZZLE_WORKERS, PuzzleBank  # noqa: E402
+from storage import Storage  # noqa: E402
+
+
+def fill(size, workers):
+    db = Storage(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    started = time.perf_counter()
+    bank = PuzzleBank(db, target=size, low_water=size, workers=workers)
+    bank.refill()
+    while any(level["pending"] for level in bank.stats()["levels"].values()):
+        time.sleep(0.01)
+    return bank, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=40, help="puzzles per difficulty")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, PUZZLE_WORKERS}))
+    args = parser.parse_args()
+
+    print(f"{'workers':>7}  {'fill s':>7}  {'puzzles/s':>9}  " + "  ".join(f"{d + '/core':>12}" for d in DIFFICULTY_CLUES))
+    for workers in args.workers:
+        bank, elapsed = fill(args.size, workers)
+        stats = bank.stats()
+        total = sum(level["generated"] for level in stats["levels"].values())
+        per_core = "  ".join(f"{stats['levels'][d]['per_core']:>12.1f}" for d in DIFFICULTY_CLUES)
+        print(f"{workers:>7}  {elapsed:>7.2f}  {total / elapsed:>9.1f}  {per_core}")
+
+    # The last bank is full: compare the pop path with generating on demand
+    for difficulty in DIFFICULTY_CLUES:
+        runs = min(20, args.size // 2)
+        started = time.perf_counter()
+        for _ in range(runs):
+            bank.pop(difficulty)
+        popped = (time.perf_counter() - started) / runs
+        started = time.perf_counter()
+        for _ in range(runs):
+            generate_sudoku(difficulty)
+        generated = (time.perf_counter() - started) / runs
+        print(f"{difficulty:<7} pop {popped * 1000:6.2f} ms   generate {generated * 1000:7.2f} ms")
+    bank.close()
+
+
+if __name__ == "__main__":
+    main()
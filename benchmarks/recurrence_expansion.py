@@ -0,0 +1,51 @@
+"""Recurring chore expansion cost for a large family.
+
+Builds hundreds of recurring tasks that started up to five years ago and
+times lazy expansion over day, week and month windows, against
+materializing every occurrence since each task's start. Run from the
+repository root:
+
+    python benchmarks/recurrence_expansion.py --tasks 500
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recurrence import RecurrenceRule  # noqa: E402
+
+RULES = ["FREQ=DAILY", "FREQ=WEEKLY", "FREQ=WEEKLY;BYDAY=MO,WE,FR", "FREQ=MONTHLY", "FREQ=DAILY;INTERVAL=2"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    today = datetime.date.today()
+    tasks = [
+        (RecurrenceRule.parse(rng.choice(RULES)), today - datetime.timedelta(days=rng.randint(0, 5 * 365)))
+        for _ in range(args.tasks)
+    ]
+
+    def expand(start, end):
+        return sum(1 for rule, dtstart in tasks for _ in rule.between(dtstart, start, end))
+
+    print(f"{args.tasks} recurring tasks")
+    for label, days in (("day", 0), ("week", 6), ("month", 30)):
+        end = today + datetime.timedelta(days=days)
+        runs = 20
+        seconds = timeit.timeit(lambda: expand(today, end), number=runs) / runs
+        print(f"  lazy {label:<5} window: {expand(today, end):>6} occurrences in {seconds * 1000:7.2f} ms")
+
+    seconds = timeit.timeit(lambda: expand(datetime.date.min, today), number=1)
+    print(f"  materialize all to date: {expand(datetime.date.min, today):>6} occurrences in {seconds * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Session-state footprint per session, with cold sections offloaded.
+
+Runs several ``AppTest`` sessions of ``app.py`` in one process against a
+fresh database seeded with feed posts. Each session logs in and opens the
+feed, the games, the journal and the chatbot, then settles on a different
+section. Afterwards the shared ``SessionMemory`` report gives approximate
+bytes per session and per key. Feed posts held by the shared buffer are
+counted as references only. For comparison, the report also shows what each
+session would hold if every section's state stayed resident: the largest
+size each key reached. Run from the repository root:
+
+    python benchmarks/session_memory.py --sessions 20 --posts 500
+"""
+import argparse
+import collections
+import datetime
+import gc
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+SECTIONS = ["🌐 Momenta Network", "🧩 Brain Games", "📔 Journaling", "🤖 CBT Chatbot"]
+
+
+def widget(elements, label):
+    return next(e for e in elements if e.label == label)
+
+
+def shared_memory():
+    """The app's ``SessionMemory``; every AppTest in this process shares it via st.cache_resource."""
+    from sessions import SessionMemory
+
+    return next(obj for obj in gc.get_objects() if isinstance(obj, SessionMemory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=500, help="feed posts to seed")
+    args = parser.parse_args()
+
+    os.environ["MOMENTA_DB"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+    os.environ.setdefault("MOMENTA_SCRYPT_N", "1024")  # keep login cost out of the way
+    sys.path.insert(0, ROOT)
+    from sessions import approx_size
+    from storage import Storage
+    from streamlit.testing.v1 import AppTest
+
+    db = Storage()
+    now = datetime.datetime.now()
+    for i in range(args.posts):
+        db.add_post(f"mom_{i % 50}", f"Post {i}: small wins today", now - datetime.timedelta(minutes=args.posts - i))
+    db.add_journal("demo_mom", "Busy day, a little tired but grateful", datetime.datetime.now())
+    db.close()
+
+    resident = collections.defaultdict(int)  # key -> largest size seen in any session
+    for n in range(args.sessions):
+        at = AppTest.from_file(APP, default_timeout=60)
+        at.run()
+        widget(at.text_input, "Username").input("demo_mom")
+        widget(at.text_input, "Password").input("password123")
+        widget(at.button, "Log In").click().run()
+        for section in SECTIONS + [SECTIONS[n % len(SECTIONS)]]:
+            at.radio(key="dashboard_section").set_value(section).run()
+            if section == "🧩 Brain Games":
+                at.radio[1].set_value("2048 (Logic Puzzle)").run()
+            if at.exception:
+                sys.exit(f"{section}: {at.exception}")
+            memory = shared_memory()
+            skip = {id(obj) for obj in memory.shared()}
+            for key in at.session_state:
+                resident[key] = max(resident[key], approx_size(at.session_state[key], skip))
+
+    report = shared_memory().report()
+    print(f"{report['sessions']} sessions, {report['bytes'] / 1024:.1f} KB of session state "
+          f"({report['bytes'] / report['sessions'] / 1024:.1f} KB per session)")
+    everything = sum(resident.values())
+    print(f"all sections resident: {everything / 1024:.1f} KB per session")
+    print(f"\n{'key':<40} {'total KB':>9} {'resident KB':>12} {'offloaded':>10}")
+    for key in sorted(set(report["by_key"]) | set(resident), key=lambda k: -resident.get(k, 0))[:15]:
+        print(f"{key:<40} {report['by_key'].get(key, 0) / 1024:>9.1f} {resident.get(key, 0) / 1024:>12.1f} "
+              f"{report['offloaded'].get(key, 0):>10}")
+
+
+if __name__ == "__main__":
+    main()
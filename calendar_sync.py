@@ -0,0 +1,308 @@
+"""Background sync for calendars linked by URL.
+
+``CalendarSync`` is shared by every session (see ``get_calendar_sync`` in
+``app.py``). Feeds are fetched on a small thread pool, never on the script
+thread, and each sync does as little work as the feed allows:
+
+1. The request is conditional (``If-None-Match`` / ``If-Modified-Since``),
+   so an unchanged feed on a well-behaved server costs a 304 and no body.
+2. Otherwise the body is streamed and split into VEVENT blocks by
+   ``events.iter_vevents`` as it arrives. Each block is hashed, and parsed
+   only if its hash differs from the one stored for its UID, so editing
+   one event in a 2,000-event feed parses one event.
+3. Changed events are upserted and events that left the feed are deleted.
+
+Only ``http``/``https`` feeds on public hosts are fetched (redirects
+included), so a linked URL can't make the server read its own files or
+internal services. The address is checked on the socket after it
+connects, so a host that resolves to a public address for the check and
+a private one for the fetch (DNS rebinding) is refused too. Proxies from
+the environment are not used, since the proxy would pick the address.
+Set ``MOMENTA_CALENDAR_ALLOW_PRIVATE=1`` to allow private and loopback
+hosts. Bodies larger than ``MAX_FEED_BYTES`` are abandoned.
+
+Every sync is timed and its byte count recorded; ``stats`` summarises them.
+"""
+import collections
+import concurrent.futures
+import datetime
+import hashlib
+import http.client
+import ipaddress
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from events import iter_vevents, parse_vevent, vevent_key
+
+SYNC_WORKERS = 2
+SYNC_INTERVAL = int(os.environ.get("MOMENTA_CALENDAR_SYNC_INTERVAL", 15 * 60))  # seconds
+SYNC_TIMEOUT = 30
+HISTORY_SIZE = 200
+MAX_FEED_BYTES = int(os.environ.get("MOMENTA_CALENDAR_MAX_BYTES", 10 * 1024 * 1024))
+ALLOW_PRIVATE_FEEDS = os.environ.get("MOMENTA_CALENDAR_ALLOW_PRIVATE") == "1"
+
+
+def _check_address(host, address):
+    """Raise ``ValueError`` unless ``address`` (a string) is globally routable."""
+    address = ipaddress.ip_address(address.split("%")[0])
+    if address.version == 6 and address.ipv4_mapped is not None:
+        address = address.ipv4_mapped  # ::ffff:127.0.0.1 is 127.0.0.1
+    if not address.is_global or address.is_multicast:
+        raise ValueError(f"{host} is a private or local address.")
+
+
+def check_feed_url(url, allow_private=False):
+    """Raise ``ValueError`` unless ``url`` is http(s) on a public host.
+
+    Every address the host resolves to must be globally routable, unless
+    ``allow_private`` is set. This gives an early answer when a feed is
+    linked; the fetch itself checks the address it actually connected to.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("Calendar links must be http://, https:// or webcal:// URLs.")
+    if allow_private:
+        return
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        infos = socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, ValueError) as exc:
+        raise ValueError(f"Can't resolve {parts.hostname}.") from exc
+    for info in infos:
+        _check_address(parts.hostname, info[4][0])
+
+
+class _PeerCheck(http.client.HTTPConnection):
+    """Checks the connected socket's address before anything is sent (or TLS starts)."""
+
+    allow_private = False
+
+    def connect(self):
+        super().connect()
+        if not self.allow_private:
+            try:
+                _check_address(self.host, self.sock.getpeername()[0])
+            except ValueError:
+                self.sock.close()
+                self.sock = None
+                raise
+
+
+class _PublicHTTPConnection(_PeerCheck):
+    pass
+
+
+class _PublicHTTPSConnection(http.client.HTTPSConnection, _PeerCheck):
+    pass
+
+
+def _connection_factory(cls, allow_private):
+    def connection(*args, **kwargs):
+        conn = cls(*args, **kwargs)
+        conn.allow_private = allow_private
+        return conn
+    return connection
+
+
+class _PublicHTTPHandler(urllib.request.HTTPHandler):
+    def __init__(self, allow_private):
+        super().__init__()
+        self.allow_private = allow_private
+
+    def http_open(self, req):
+        return self.do_open(_connection_factory(_PublicHTTPConnection, self.allow_private), req)
+
+
+class _PublicHTTPSHandler(urllib.request.HTTPSHandler):
+    def __init__(self, allow_private):
+        super().__init__()
+        self.allow_private = allow_private
+
+    def https_open(self, req):
+        return self.do_open(_connection_factory(_PublicHTTPSConnection, self.allow_private), req,
+                            context=self._context)
+
+
+class _CheckedRedirects(urllib.request.HTTPRedirectHandler):
+    """Applies ``check_feed_url`` to every redirect target."""
+
+    def __init__(self, allow_private):
+        super().__init__()
+        self.allow_private = allow_private
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_feed_url(newurl, self.allow_private)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _block_hash(block):
+    return hashlib.sha256("\n".join(block).encode()).hexdigest()
+
+
+class _CountingLines:
+    """Iterates a response's lines while counting the bytes received.
+
+    Raises ``ValueError`` once more than ``limit`` bytes have arrived; a
+    single line is never read past the limit either.
+    """
+
+    def __init__(self, response, limit=MAX_FEED_BYTES):
+        self.response = response
+        self.limit = limit
+        self.bytes = 0
+
+    def __iter__(self):
+        while True:
+            line = self.response.readline(self.limit - self.bytes + 1)
+            if not line:
+                return
+            self.bytes += len(line)
+            if self.bytes > self.limit:
+                raise ValueError(f"Feed is larger than {self.limit} bytes.")
+            yield line
+
+
+class CalendarSync:
+    """Keeps linked calendars up to date from a background thread pool."""
+
+    def __init__(self, db, event_store, workers=SYNC_WORKERS, interval=SYNC_INTERVAL, timeout=SYNC_TIMEOUT,
+                 max_bytes=MAX_FEED_BYTES, allow_private=ALLOW_PRIVATE_FEEDS):
+        self.db = db
+        self.event_store = event_store
+        self.interval = interval
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.allow_private = allow_private
+        self._opener = urllib.request.build_opener(
+            urllib.request.ProxyHandler({}),
+            _PublicHTTPHandler(allow_private),
+            _PublicHTTPSHandler(allow_private),
+            _CheckedRedirects(allow_private),
+        )
+        self._pool = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="calendar-sync")
+        self._lock = threading.Lock()
+        self._running = {}  # (owner, calendar) -> Future
+        self.history = collections.deque(maxlen=HISTORY_SIZE)
+
+    def link(self, owner, calendar, url):
+        """Link a feed and start its first sync. Returns the Future.
+
+        Raises ``ValueError`` for URLs that may not be fetched.
+        """
+        if url.startswith("webcal://"):
+            url = "https://" + url[len("webcal://"):]
+        check_feed_url(url, self.allow_private)
+        self.db.add_feed(owner, calendar, url)
+        return self.submit(owner, calendar)
+
+    def submit(self, owner, calendar):
+        """Queue a sync unless one for the same feed is already running."""
+        key = (owner, calendar)
+        with self._lock:
+            future = self._running.get(key)
+            if future is None or future.done():
+                future = self._pool.submit(self._sync_logged, owner, calendar)
+                self._running[key] = future
+            return future
+
+    def refresh_due(self, owner=None):
+        """Queue every feed (for one user, or all) not synced within ``interval``."""
+        cutoff = datetime.datetime.now() - datetime.timedelta(seconds=self.interval)
+        futures = []
+        for feed in self.db.list_feeds(owner):
+            if feed["last_synced"] is None or datetime.datetime.fromisoformat(feed["last_synced"]) < cutoff:
+                futures.append(self.submit(feed["owner"], feed["calendar"]))
+        return futures
+
+    def _sync_logged(self, owner, calendar):
+        try:
+            result = self.sync(owner, calendar)
+        except Exception as exc:  # a broken feed must not kill the worker
+            result = {"owner": owner, "calendar": calendar, "status": "error", "error": str(exc),
+                      "seconds": 0.0, "bytes": 0, "parsed": 0, "upserted": 0, "deleted": 0}
+            self.db.update_feed(owner, calendar, last_synced=datetime.datetime.now().isoformat(),
+                                last_status=f"error: {exc}")
+        self.history.append(result)
+        return result
+
+    def sync(self, owner, calendar):
+        """Fetch one feed and apply only what changed. Returns a metrics dict.
+
+        ``status`` is ``not-modified`` (304), ``unchanged`` (no event
+        differs) or ``updated``.
+        """
+        feed = next(f for f in self.db.list_feeds(owner) if f["calendar"] == calendar)
+        started = time.perf_counter()
+        result = {"owner": owner, "calendar": calendar, "status": "unchanged",
+                  "bytes": 0, "parsed": 0, "upserted": 0, "deleted": 0}
+        state = {}
+
+        # Checked again on every sync: the host may resolve differently by now
+        check_feed_url(feed["url"], self.allow_private)
+        request = urllib.request.Request(feed["url"], headers={"Accept": "text/calendar"})
+        if feed["etag"]:
+            request.add_header("If-None-Match", feed["etag"])
+        if feed["last_modified"]:
+            request.add_header("If-Modified-Since", feed["last_modified"])
+        try:
+            response = self._opener.open(request, timeout=self.timeout)
+        except urllib.error.HTTPError as exc:
+            if exc.code != 304:
+                raise
+            result["status"] = "not-modified"
+        else:
+            with response:
+                state["etag"] = response.headers.get("ETag")
+                state["last_modified"] = response.headers.get("Last-Modified")
+                lines = _CountingLines(response, self.max_bytes)
+                known = self.db.list_event_hashes(owner, calendar)
+                seen, changed = set(), []
+                for block in iter_vevents(lines):
+                    digest = _block_hash(block)
+                    key = vevent_key(block)
+                    if key[0] is not None and known.get(key) == digest:
+                        seen.add(key)
+                        continue
+                    event = parse_vevent(block)
+                    result["parsed"] += 1
+                    if event is not None:
+                        rid = event["recurrence_id"]
+                        key = (event["uid"], rid.isoformat() if rid else "")
+                        seen.add(key)
+                        if known.get(key) != digest:  # events without a UID land here
+                            event["hash"] = digest
+                            changed.append(event)
+                result["bytes"] = lines.bytes
+                removed = set(known) - seen
+                if changed:
+                    self.db.upsert_events(owner, calendar, changed)
+                if removed:
+                    self.db.delete_events(owner, calendar, removed)
+                result["upserted"], result["deleted"] = len(changed), len(removed)
+                if changed or removed:
+                    result["status"] = "updated"
+                    self.event_store.invalidate(owner)
+
+        result["seconds"] = time.perf_counter() - started
+        state["last_synced"] = datetime.datetime.now().isoformat()
+        state["last_status"] = result["status"]
+        self.db.update_feed(owner, calendar, **state)
+        return result
+
+    def stats(self):
+        """Totals over the recent sync history: count, errors, bytes and durations."""
+        history = list(self.history)
+        durations = [r["seconds"] for r in history if r["status"] != "error"]
+        by_status = collections.Counter(r["status"] for r in history)
+        return {
+            "syncs": len(history),
+            "by_status": dict(by_status),
+            "bytes": sum(r["bytes"] for r in history),
+            "mean_seconds": sum(durations) / len(durations) if durations else 0.0,
+            "max_seconds": max(durations, default=0.0),
+        }
@@ -0,0 +1,426 @@
+"""The CBT chatbot behind the "CBT Chatbot" tab.
+
+Replies are picked by intent. Each intent is a row in ``INTENTS`` with its
+trigger words, a priority and a canned response; all triggers are compiled
+once into a single trie-shaped regex so a message is classified in one pass
+no matter how many rules there are.
+
+Heavier reply engines plug in as a ``ChatBackend`` and run on a
+``ChatWorkerPool`` so they never block the Streamlit script thread. A
+``ResponseCache`` in front of the pool answers repeated messages without
+touching the backend.
+"""
+import codecs
+import collections
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+
+# Higher priority wins when a message hits several intents.
+INTENTS = [
+    {
+        "name": "stress",
+        "priority": 40,
+        "triggers": [
+            "stress", "stressed", "stressful", "stressing",
+            "overwhelm", "overwhelmed", "overwhelming",
+            "too much", "busy",
+        ],
+        "response": "It sounds like you're carrying a heavy load right now. In CBT, we look at how to break large stressors into smaller, manageable pieces. What is ONE small thing you can control right now?",
+    },
+    {
+        "name": "tired",
+        "priority": 30,
+        "triggers": [
+            "tired", "exhausted", "exhausting", "exhaustion",
+            "sleep", "sleeping", "sleepy", "sleepless",
+        ],
+        "response": "Being a working mom is incredibly demanding on your nervous system. Your brain needs rest to form new neural pathways (neuroplasticity). Can you find a 10-minute window for yourself today just to breathe?",
+    },
+    {
+        "name": "family",
+        "priority": 20,
+        "triggers": [
+            "kid", "kids", "child", "children", "childcare",
+            "husband", "family",
+        ],
+        "response": "Family dynamics can trigger automatic negative thoughts. Let's reframe: Instead of thinking 'I have to do everything perfectly,' try 'I am doing my best, and good enough is perfectly fine.' How does that feel?",
+    },
+    {
+        "name": "sad",
+        "priority": 10,
+        "triggers": ["sad", "sadness", "depressed", "depression", "down"],
+        "response": "I hear you. It's completely valid to feel that way. What is a small, healthy habit that usually brings you a tiny bit of joy? A hot cup of tea? A short walk?",
+    },
+]
+
+DEFAULT_RESPONSE = "Thank you for sharing that with me. What specific thought crossed your mind just before you started feeling this way?"
+
+
+def _trie_pattern(words):
+    """Regex source for ``words`` with shared prefixes factored out.
+
+    A flat ``a|ab|abc`` alternation retries every branch at each position;
+    the trie form walks one branch per character instead.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        if list(node) == [""]:
+            return ""
+        optional = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            body = body + "?" if len(branches) > 1 or len(body) == 1 else f"(?:{body})?"
+        return body
+
+    return build(trie)
+
+
+class IntentMatcher:
+    """Classifies a message against a rule set in a single regex pass."""
+
+    def __init__(self, intents):
+        self.intents = intents
+        self._by_name = {intent["name"]: intent for intent in intents}
+        self._by_trigger = {}
+        for intent in intents:
+            for trigger in intent["triggers"]:
+                self._by_trigger[_normalize(trigger)] = intent
+        self._pattern = re.compile(r"\b" + _trie_pattern(self._by_trigger) + r"\b")
+
+    def classify(self, message):
+        """The best matching intent, or None.
+
+        Every hit adds to its intent's count; the winner is the intent with
+        the highest priority, with more hits breaking ties.
+        """
+        hits = {}
+        for match in self._pattern.finditer(_normalize(message)):
+            name = self._by_trigger[match.group()]["name"]
+            hits[name] = hits.get(name, 0) + 1
+        if not hits:
+            return None
+        best = max(hits, key=lambda name: (self._by_name[name]["priority"], hits[name]))
+        return self._by_name[best]
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+matcher = IntentMatcher(INTENTS)
+
+
+def simple_cbt_bot(user_message):
+    """A simulated CBT bot that responds based on keywords."""
+    intent = matcher.classify(user_message)
+    return intent["response"] if intent else DEFAULT_RESPONSE
+
+
+_TOKEN_RE = re.compile(r"\s*\S+")
+
+
+def stream_cbt_bot(user_message):
+    """Yield the bot's reply a token at a time, for ``st.write_stream``.
+
+    This is the interface the chat tab consumes: any generator of text
+    chunks can stand in for it, e.g. one that reads tokens from a local
+    model as they are produced.
+    """
+    yield from _tokens(simple_cbt_bot(user_message))
+
+
+def _tokens(text):
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group()
+
+
+# ==========================================
+# PLUGGABLE BACKENDS
+# ==========================================
+CHAT_BACKEND_URL = os.environ.get("MOMENTA_CHAT_BACKEND_URL")
+CHAT_WORKERS = int(os.environ.get("MOMENTA_CHAT_WORKERS", 2))
+CHAT_QUEUE_SIZE = int(os.environ.get("MOMENTA_CHAT_QUEUE_SIZE", 8))
+CHAT_TIMEOUT = float(os.environ.get("MOMENTA_CHAT_TIMEOUT", 20))
+
+# Shown (and saved) between a reply the backend dropped and the keyword reply that completes it
+REPLY_INTERRUPTED = "\n\n*(Reply interrupted.)*\n\n"
+
+
+class ChatBackend:
+    """A reply engine. ``stream`` yields text chunks and should stop early
+    once ``cancelled`` is set. ``context`` is the conversation's rolling
+    summary (see ``update_summary``), never the full history.
+
+    ``uses_context`` says whether replies depend on ``context``; if they do,
+    ``ResponseCache`` only replays a reply for the same context.
+    """
+
+    uses_context = False
+
+    def stream(self, user_message, cancelled, context=None):
+        raise NotImplementedError
+
+
+class KeywordBackend(ChatBackend):
+    """The built-in keyword responder."""
+
+    def stream(self, user_message, cancelled, context=None):
+        return stream_cbt_bot(user_message)
+
+
+class HTTPBackend(ChatBackend):
+    """Posts ``{"message": ..., "context": ...}`` to ``url`` and streams the
+    plain-text body back as it arrives, e.g. from a local model server on
+    localhost."""
+
+    uses_context = True
+
+    def __init__(self, url, timeout=CHAT_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def stream(self, user_message, cancelled, context=None):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"message": user_message, "context": context}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            while not cancelled.is_set():
+                chunk = response.read1(1024)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+
+
+class ChatJob:
+    """One queued request. Tokens arrive on ``output``; ``None`` marks the end."""
+
+    def __init__(self, user_message, context=None):
+        self.user_message = user_message
+        self.context = context
+        self.cancelled = threading.Event()
+        self.output = queue.Queue()
+
+    def cancel(self):
+        self.cancelled.set()
+
+
+class ChatWorkerPool:
+    """Runs a backend on a fixed set of worker threads behind a bounded queue.
+
+    Shared by every session (see ``get_chat_pool`` in ``app.py``). When the
+    queue is full ``submit`` returns None and the caller falls back to the
+    keyword responder.
+    """
+
+    _DONE = None
+
+    def __init__(self, backend, workers=CHAT_WORKERS, queue_size=CHAT_QUEUE_SIZE, timeout=CHAT_TIMEOUT):
+        self.backend = backend
+        self.timeout = timeout
+        self._jobs = queue.Queue(maxsize=queue_size)
+        for n in range(workers):
+            threading.Thread(target=self._work, name=f"chat-worker-{n}", daemon=True).start()
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if not job.cancelled.is_set():
+                    for chunk in self.backend.stream(job.user_message, job.cancelled, job.context):
+                        if job.cancelled.is_set():
+                            break
+                        job.output.put(chunk)
+            except Exception as exc:  # a broken backend must not kill the worker
+                job.output.put(exc)
+            finally:
+                job.output.put(self._DONE)
+                self._jobs.task_done()
+
+    def submit(self, user_message, context=None):
+        job = ChatJob(user_message, context)
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            return None
+        return job
+
+    def stream(self, user_message, on_complete=None, context=None):
+        """Yield the reply for ``user_message``, for ``st.write_stream``.
+
+        Falls back to the keyword responder when the queue is saturated, the
+        backend fails, or nothing arrives before the timeout. If that happens
+        part-way through a reply, ``REPLY_INTERRUPTED`` and the keyword reply
+        follow what was already sent, so a cut-off reply never passes for a
+        whole one. If the consumer stops early (the user navigated away and
+        the script was stopped) the job is cancelled so the worker can move on.
+
+        ``on_complete`` is called with the full text only when the backend
+        itself finished the reply, never for a fallback.
+        """
+        job = self.submit(user_message, context)
+        if job is None:
+            yield from stream_cbt_bot(user_message)
+            return
+
+        deadline = time.monotonic() + self.timeout
+        chunks = []
+        finished = False
+        try:
+            while True:
+                try:
+                    chunk = job.output.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if isinstance(chunk, Exception):
+                    break
+                if chunk is self._DONE:
+                    finished = True
+                    if on_complete is not None and chunks:
+                        on_complete("".join(chunks))
+                    break
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            job.cancel()
+        if not chunks:
+            yield from stream_cbt_bot(user_message)
+        elif not finished:
+            yield REPLY_INTERRUPTED
+            yield from stream_cbt_bot(user_message)
+
+
+def default_backend():
+    """The backend named by ``MOMENTA_CHAT_BACKEND_URL``, else the keyword bot."""
+    if CHAT_BACKEND_URL:
+        return HTTPBackend(CHAT_BACKEND_URL)
+    return KeywordBackend()
+
+
+# ==========================================
+# RESPONSE CACHE
+# ==========================================
+RESPONSE_CACHE_SIZE = 2048
+RESPONSE_CACHE_TTL = 60 * 60  # seconds
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_message(text):
+    """Cache key for a message: casefolded, punctuation stripped, whitespace collapsed."""
+    return " ".join(_PUNCTUATION_RE.sub("", text.casefold()).split())
+
+
+def cache_key(user_message, context=None):
+    """``normalize_message``, plus a digest of ``context`` when there is one.
+
+    The context carries snippets of one user's own messages, so a reply
+    built from it must never be replayed to anyone with a different context.
+    """
+    key = normalize_message(user_message)
+    if context is None:
+        return key
+    digest = hashlib.sha256(json.dumps(context, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{key}\x00{digest}"
+
+
+class ResponseCache:
+    """Shared LRU/TTL cache of finished replies, keyed by normalized message.
+
+    Shared by every session (see ``get_response_cache`` in ``app.py``).
+    Replies from backends that use the conversation context are keyed by
+    that context as well (see ``cache_key``).
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # key -> (reply, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, reply):
+        with self._lock:
+            self._entries[key] = (reply, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+            }
+
+    def stream(self, user_message, pool, context=None):
+        """Replay a cached reply, or stream one from ``pool`` and remember it."""
+        key = cache_key(user_message, context if pool.backend.uses_context else None)
+        reply = self.get(key)
+        if reply is not None:
+            yield from _tokens(reply)
+            return
+        yield from pool.stream(
+            user_message, on_complete=lambda text: self.put(key, text), context=context
+        )
+
+
+# ==========================================
+# CHAT HISTORY WINDOW & ROLLING SUMMARY
+# ==========================================
+CHAT_WINDOW = int(os.environ.get("MOMENTA_CHAT_WINDOW", 20))
+SUMMARY_RECENT = 3
+SUMMARY_SNIPPET = 160
+
+
+def update_summary(summary, user_message):
+    """Fold one user turn into the rolling summary.
+
+    The summary counts turns and recurring topics and keeps the last few
+    messages as short snippets, so it stays the same size however long the
+    conversation runs.
+    """
+    summary = dict(summary or {"turns": 0, "topics": {}, "recent": []})
+    summary["turns"] += 1
+    intent = matcher.classify(user_message)
+    if intent:
+        topics = dict(summary["topics"])
+        topics[intent["name"]] = topics.get(intent["name"], 0) + 1
+        summary["topics"] = topics
+    snippet = " ".join(user_message.split())[:SUMMARY_SNIPPET]
+    summary["recent"] = (summary["recent"] + [snippet])[-SUMMARY_RECENT:]
+    return summary
@@ -0,0 +1,413 @@
+"""Family calendar: .ics import and fast date-range lookups.
+
+``.ics`` files are read with a streaming parser: lines are unfolded and
+split into VEVENT blocks as they arrive, so a large export is never held in
+memory as a whole. Parsed events are upserted by UID into SQLite, and a
+re-import deletes the calendar's events that are no longer in the file.
+
+``EventStore`` is shared by every session (see ``get_event_store`` in
+``app.py``) and keeps one ``EventIndex`` per user. One-off events sit in an
+interval index (events sorted by start, augmented with the maximum end time
+of each implicit subtree), so a week or month view only visits events that
+overlap it. Recurring events are expanded for the requested window only,
+using the same ``recurrence`` rules as Family Manager chores. Instances
+listed in EXDATE are skipped, and an instance overridden by a VEVENT with
+the same UID and a RECURRENCE-ID is replaced by that override.
+"""
+import collections
+import datetime
+import hashlib
+import html
+import itertools
+import re
+import threading
+import zoneinfo
+
+from recurrence import RecurrenceRule
+
+MAX_CACHED_OWNERS = 1000
+IMPORT_BATCH_SIZE = 500
+MAX_ITEMS_PER_DAY = 4
+
+_DURATION_RE = re.compile(
+    r"([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$"
+)
+_UNESCAPE_RE = re.compile(r"\\([\\;,nN])")
+
+
+# ==========================================
+# ICS PARSING
+# ==========================================
+def unfold(lines):
+    """Join RFC 5545 folded lines. Accepts an iterable of str or bytes lines."""
+    current = None
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", "replace")
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def iter_vevents(lines):
+    """Yield each VEVENT as its list of unfolded content lines.
+
+    Nested components (VALARM) are dropped; everything outside a VEVENT,
+    such as VTIMEZONE definitions, is skipped.
+    """
+    block = None
+    depth = 0
+    for line in unfold(lines):
+        upper = line.upper()
+        if upper == "BEGIN:VEVENT":
+            block, depth = [], 0
+        elif block is None:
+            continue
+        elif upper.startswith("BEGIN:"):
+            depth += 1
+        elif upper.startswith("END:"):
+            if depth:
+                depth -= 1
+            elif upper == "END:VEVENT":
+                yield block
+                block = None
+        elif not depth:
+            block.append(line)
+
+
+def _split_line(line):
+    """``(NAME, {PARAM: value}, value)`` for one content line."""
+    in_quotes = False
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ":" and not in_quotes:
+            break
+    else:
+        return line.upper(), {}, ""
+    name, *params = line[:i].split(";")
+    params = dict(param.split("=", 1) for param in params if "=" in param)
+    return name.upper(), {k.upper(): v.strip('"') for k, v in params.items()}, line[i + 1:]
+
+
+def _parse_when(value, params):
+    """``(naive local datetime, all_day)`` for a DTSTART/DTEND value."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.datetime.strptime(value[:8], "%Y%m%d"), True
+    when = datetime.datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        when = when.replace(tzinfo=datetime.timezone.utc)
+    elif "TZID" in params:
+        try:
+            when = when.replace(tzinfo=zoneinfo.ZoneInfo(params["TZID"]))
+        except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+            pass  # unknown zone: treat as floating local time
+    if when.tzinfo is not None:
+        when = when.astimezone().replace(tzinfo=None)
+    return when, False
+
+
+def _parse_duration(value):
+    match = _DURATION_RE.match(value.strip().upper())
+    if not match:
+        raise ValueError(f"Bad DURATION: {value}")
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = datetime.timedelta(
+        weeks=int(weeks or 0), days=int(days or 0),
+        hours=int(hours or 0), minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    return -delta if sign == "-" else delta
+
+
+def _unescape(value):
+    return _UNESCAPE_RE.sub(lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _parse_dates(value, params):
+    """Datetimes of a comma-separated EXDATE value."""
+    return [_parse_when(part, params)[0] for part in value.split(",") if part.strip()]
+
+
+def vevent_key(block):
+    """``(uid, recurrence_id)`` of a VEVENT block, as stored by ``Storage.upsert_events``.
+
+    ``recurrence_id`` is the ISO start of the instance an override replaces,
+    or '' for whole events and series. ``uid`` is None when the block has no UID.
+    """
+    uid, recurrence_id = None, ""
+    for line in block:
+        head = line[:13].upper()
+        if head.startswith(("UID:", "UID;")):
+            uid = line.split(":", 1)[1]
+        elif head == "RECURRENCE-ID":
+            name, params, value = _split_line(line)
+            if name == "RECURRENCE-ID":
+                try:
+                    recurrence_id = _parse_when(value, params)[0].isoformat()
+                except ValueError:
+                    pass
+    return uid, recurrence_id
+
+
+def parse_vevent(block):
+    """Event dict for one VEVENT block, or None if it has no usable DTSTART."""
+    props = {}
+    exdate_lines = []
+    for line in block:
+        name, params, value = _split_line(line)
+        props.setdefault(name, (params, value))
+        if name == "EXDATE":
+            exdate_lines.append((params, value))
+    if "DTSTART" not in props:
+        return None
+    try:
+        start, all_day = _parse_when(props["DTSTART"][1], props["DTSTART"][0])
+        if "DTEND" in props:
+            end = _parse_when(props["DTEND"][1], props["DTEND"][0])[0]
+        elif "DURATION" in props:
+            end = start + _parse_duration(props["DURATION"][1])
+        else:
+            end = start + datetime.timedelta(days=1 if all_day else 0)
+        recurrence_id = None
+        if "RECURRENCE-ID" in props:
+            recurrence_id = _parse_when(props["RECURRENCE-ID"][1], props["RECURRENCE-ID"][0])[0]
+        exdates = [when for params, value in exdate_lines for when in _parse_dates(value, params)]
+    except ValueError:
+        return None
+
+    rrule = props.get("RRULE", (None, None))[1]
+    if rrule:
+        try:
+            rrule = str(RecurrenceRule.parse(rrule))
+        except (ValueError, KeyError):
+            rrule = None  # unsupported rule (e.g. BYMONTHDAY): keep the first occurrence only
+    summary = _unescape(props.get("SUMMARY", ({}, ""))[1]) or "(no title)"
+    uid = props.get("UID", ({}, ""))[1] or hashlib.sha1(f"{summary}|{start}".encode()).hexdigest()
+    return {
+        "uid": uid,
+        "recurrence_id": recurrence_id,
+        "summary": summary,
+        "location": _unescape(props.get("LOCATION", ({}, ""))[1]),
+        "start": start,
+        "end": max(end, start),
+        "all_day": all_day,
+        "rrule": rrule,
+        "exdates": exdates,
+    }
+
+
+def parse_ics(lines):
+    """Stream event dicts out of an iterable of .ics lines."""
+    for block in iter_vevents(lines):
+        event = parse_vevent(block)
+        if event is not None:
+            yield event
+
+
+# ==========================================
+# INTERVAL INDEX
+# ==========================================
+class EventIndex:
+    """One user's events, queryable by overlapping time range.
+
+    One-off events are kept sorted by start; ``_max_end[i]`` holds the
+    latest end time in the implicit balanced subtree rooted at ``i`` (the
+    midpoint of its slice), so a range query skips every subtree that ends
+    before the window and stops at the first event starting after it.
+    """
+
+    def __init__(self, events=()):
+        events = list(events)
+        # Starts of instances that an override replaces or EXDATE removes, by UID
+        self._skipped = collections.defaultdict(set)
+        for event in events:
+            if event.get("recurrence_id") is not None:
+                self._skipped[event["uid"]].add(event["recurrence_id"])
+            elif event.get("exdates"):
+                self._skipped[event["uid"]].update(event["exdates"])
+        self._events = []
+        self._recurring = []  # (event, RecurrenceRule)
+        for event in events:
+            rule = None
+            if event.get("rrule") and event.get("recurrence_id") is None:
+                try:
+                    rule = RecurrenceRule.parse(event["rrule"])
+                except ValueError:
+                    pass  # stored before the rule was rejected at import: first occurrence only
+            if rule is not None:
+                self._recurring.append((event, rule))
+            elif event.get("recurrence_id") is not None or event["start"] not in self._skipped.get(event["uid"], ()):
+                self._events.append(event)
+        self._events.sort(key=lambda event: event["start"])
+        self._max_end = [None] * len(self._events)
+        self._build(0, len(self._events))
+
+    def __len__(self):
+        return len(self._events) + len(self._recurring)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        latest = self._events[mid]["end"]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > latest:
+                latest = child
+        self._max_end[mid] = latest
+        return latest
+
+    def _overlapping(self, lo, hi, start, end, out):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] < start:
+            return  # the whole subtree ends before the window
+        self._overlapping(lo, mid, start, end, out)
+        event = self._events[mid]
+        if event["start"] >= end:
+            return  # this event and everything to its right start after the window
+        if event["end"] > start or event["start"] >= start:
+            out.append(event)
+        self._overlapping(mid + 1, hi, start, end, out)
+
+    def between(self, start, end):
+        """Occurrences overlapping ``[start, end)``, as dicts with their own start/end, by start."""
+        hits = []
+        self._overlapping(0, len(self._events), start, end, hits)
+        occurrences = [dict(event) for event in hits]
+        for event, rule in self._recurring:
+            skipped = self._skipped.get(event["uid"], ())
+            length = event["end"] - event["start"]
+            # Widen the window so occurrences that began earlier but still run are included.
+            first = (start - length).date()
+            for day in rule.between(event["start"].date(), first, end.date()):
+                occ_start = datetime.datetime.combine(day, event["start"].time())
+                if occ_start in skipped:
+                    continue
+                occ_end = occ_start + length
+                if occ_start < end and (occ_end > start or occ_start >= start):
+                    occurrences.append(dict(event, start=occ_start, end=occ_end))
+        occurrences.sort(key=lambda event: (event["start"], event["summary"]))
+        return occurrences
+
+
+class EventStore:
+    """Per-user ``EventIndex`` cache over the ``calendar_events`` table."""
+
+    def __init__(self, db, max_owners=MAX_CACHED_OWNERS):
+        self.db = db
+        self.max_owners = max_owners
+        self._lock = threading.Lock()
+        self._indexes = collections.OrderedDict()  # owner -> EventIndex, LRU order
+
+    def _index(self, owner):
+        with self._lock:
+            index = self._indexes.get(owner)
+            if index is not None:
+                self._indexes.move_to_end(owner)
+                return index
+        index = EventIndex(self.db.list_events(owner))
+        with self._lock:
+            self._indexes[owner] = index
+            while len(self._indexes) > self.max_owners:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, owner):
+        with self._lock:
+            self._indexes.pop(owner, None)
+
+    def import_ics(self, owner, calendar, lines):
+        """Stream events from ``lines`` into ``calendar``. Returns the number imported.
+
+        The file replaces the calendar: events from an earlier import that
+        are no longer in it are deleted.
+        """
+        events = parse_ics(lines)
+        seen = set()
+        while True:
+            batch = list(itertools.islice(events, IMPORT_BATCH_SIZE))
+            if not batch:
+                break
+            self.db.upsert_events(owner, calendar, batch)
+            seen.update(
+                (event["uid"], event["recurrence_id"].isoformat() if event["recurrence_id"] else "")
+                for event in batch
+            )
+        removed = set(self.db.list_event_hashes(owner, calendar)) - seen
+        if removed:
+            self.db.delete_events(owner, calendar, removed)
+        self.invalidate(owner)
+        return len(seen)
+
+    def remove_calendar(self, owner, calendar):
+        self.db.delete_calendar(owner, calendar)
+        self.invalidate(owner)
+
+    def between(self, owner, start, end):
+        return self._index(owner).between(start, end)
+
+
+# ==========================================
+# CALENDAR VIEW
+# ==========================================
+def calendar_window(view, anchor):
+    """``(first_day, day_after_last)`` of the week or month grid containing ``anchor``."""
+    if view == "Week":
+        start = anchor - datetime.timedelta(days=anchor.weekday())
+        return start, start + datetime.timedelta(days=7)
+    first = anchor.replace(day=1)
+    last = (first + datetime.timedelta(days=32)).replace(day=1) - datetime.timedelta(days=1)
+    start = first - datetime.timedelta(days=first.weekday())
+    end = last + datetime.timedelta(days=7 - last.weekday())
+    return start, end
+
+
+def calendar_html(start, end, events, tasks, month=None, max_per_day=MAX_ITEMS_PER_DAY):
+    """HTML grid for the days ``start`` to ``end`` (exclusive), a week per row.
+
+    ``events`` are occurrences from ``EventStore.between``; multi-day events
+    are shown on every day they cover. ``tasks`` are ``TaskStore.agenda``
+    items. Days outside ``month`` are dimmed. All text is escaped.
+    """
+    days = collections.defaultdict(list)
+    for event in events:
+        label = event["summary"] if event["all_day"] else f"{event['start']:%H:%M} {event['summary']}"
+        day = max(event["start"].date(), start)
+        last = (event["end"] - datetime.timedelta(microseconds=1)).date() if event["end"] > event["start"] else day
+        while day <= min(last, end - datetime.timedelta(days=1)):
+            days[day].append(("cal-event", label))
+            day += datetime.timedelta(days=1)
+    for item in tasks:
+        mark = "✅" if item["done"] else "⬜"
+        days[item["date"]].append(("cal-task", f"{mark} {item['task']['desc']} ({item['task']['assignee']})"))
+
+    today = datetime.date.today()
+    rows = []
+    day = start
+    while day < end:
+        cells = []
+        for _ in range(7):
+            classes = ["cal-day"]
+            if month is not None and day.month != month:
+                classes.append("cal-other-month")
+            if day == today:
+                classes.append("cal-today")
+            entries = days.get(day, [])
+            items = "".join(
+                f'<div class="{kind}">{html.escape(label)}</div>' for kind, label in entries[:max_per_day]
+            )
+            if len(entries) > max_per_day:
+                items += f'<div class="cal-more">+{len(entries) - max_per_day} more</div>'
+            cells.append(f'<td class="{" ".join(classes)}"><div class="cal-date">{day.day}</div>{items}</td>')
+            day += datetime.timedelta(days=1)
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+    header = "".join(f"<th>{name}</th>" for name in ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"))
+    return f'<table class="cal-grid"><thead><tr>{header}</tr></thead><tbody>{"".join(rows)}</tbody></table>'
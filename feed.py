@@ -0,0 +1,174 @@
+"""Process-wide community feed for the Momenta Network tab.
+
+A single ``CommunityFeed`` is shared by every session (see ``get_feed`` in
+``app.py``). It keeps the most recent posts in a bounded ring buffer so a
+session only has to pull posts newer than the last ID it has seen.
+
+Posts never change after they are published, so each card's HTML is
+rendered (and escaped) once and cached by post ID. Only the relative time
+("2 hours ago") changes as a post ages, so the cache holds the markup on
+either side of it and showing a page of the feed is a dict lookup, a time
+format per post and a join.
+"""
+import collections
+import datetime
+import html
+import threading
+
+FEED_CAPACITY = 500
+FEED_PAGE_SIZE = 20
+HTML_CACHE_SIZE = 2000
+
+
+def relative_time(created, now=None):
+    """``created`` as "Just now", "5 minutes ago", ... or a date once it is a week old."""
+    seconds = int(((now or datetime.datetime.now()) - created).total_seconds())
+    if seconds < 60:
+        return "Just now"
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = seconds // size
+            if unit == "day" and count >= 7:
+                return created.strftime("%b %d, %Y")
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+
+
+def render_post_parts(post):
+    """Card HTML before and after the post's time, with user text escaped."""
+    content = "<br>".join(html.escape(post["content"]).splitlines())
+    head = (
+        '<div class="post-card">'
+        f'<div class="post-author">👤 {html.escape(post["user"])} '
+        '<span class="post-time">• '
+    )
+    tail = (
+        '</span></div>'
+        f'<div class="post-body">{content}</div>'
+        '<div class="post-actions">💬 Reply &nbsp;&nbsp; ❤️ Like</div>'
+        '</div>'
+    )
+    return head, tail
+
+
+def render_post(post, now=None):
+    """HTML for a single community feed card. User text is escaped."""
+    head, tail = render_post_parts(post)
+    return head + relative_time(post["created"], now) + tail
+
+
+class PostHTMLCache:
+    """Rendered card HTML by post ID, bounded LRU.
+
+    Posts are immutable, so the ID addresses the content and an entry never
+    needs invalidating; eviction only bounds memory for old pages. Entries
+    are the ``render_post_parts`` pair; the time goes in at render.
+    """
+
+    def __init__(self, capacity=HTML_CACHE_SIZE):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._html = collections.OrderedDict()  # post ID -> (head, tail)
+
+    def add(self, post):
+        parts = render_post_parts(post)
+        with self._lock:
+            self._html[post["id"]] = parts
+            while len(self._html) > self.capacity:
+                self._html.popitem(last=False)
+        return parts
+
+    def get(self, post):
+        with self._lock:
+            parts = self._html.get(post["id"])
+            if parts is not None:
+                self._html.move_to_end(post["id"])
+                return parts
+        return self.add(post)
+
+    def render(self, posts, now=None):
+        """One HTML block for ``posts``, rendering only those not seen before."""
+        now = now or datetime.datetime.now()
+        blocks = []
+        for post in posts:
+            head, tail = self.get(post)
+            blocks.append(head + relative_time(post["created"], now) + tail)
+        return "".join(blocks)
+
+
+class CommunityFeed:
+    """Bounded, thread-safe ring buffer of recent posts.
+
+    Post IDs come from the ``community_posts`` table, so they are monotonic
+    and survive restarts. Posts are kept oldest-first in the buffer.
+    """
+
+    def __init__(self, db, capacity=FEED_CAPACITY):
+        self.db = db
+        self._lock = threading.Lock()
+        self._posts = collections.deque(reversed(db.list_posts(limit=capacity)), maxlen=capacity)
+        self.html = PostHTMLCache(max(HTML_CACHE_SIZE, capacity))
+        for post in self._posts:
+            self.html.add(post)
+
+    @property
+    def capacity(self):
+        return self._posts.maxlen
+
+    def buffered(self):
+        """The post dicts in the buffer; sessions' feed views point at these."""
+        with self._lock:
+            return list(self._posts)
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._posts[-1]["id"] if self._posts else 0
+
+    def publish(self, user, content, created):
+        """Persist a new post, render its card and append it to the buffer."""
+        # Hold the lock across the insert so IDs enter the buffer in order.
+        with self._lock:
+            post_id = self.db.add_post(user, content, created)
+            post = {"id": post_id, "user": user, "content": content, "created": created}
+            self.html.add(post)
+            self._posts.append(post)
+        return post
+
+    def render(self, posts):
+        """Cached HTML for ``posts`` as one block."""
+        return self.html.render(posts)
+
+    def since(self, last_id):
+        """Posts with an ID greater than ``last_id``, oldest first.
+
+        Walks the buffer from the newest end, so the cost is proportional to
+        the number of new posts rather than the size of the feed.
+        """
+        new_posts = []
+        with self._lock:
+            for post in reversed(self._posts):
+                if post["id"] <= last_id:
+                    break
+                new_posts.append(post)
+        new_posts.reverse()
+        return new_posts
+
+    def page(self, before_id=None, limit=FEED_PAGE_SIZE):
+        """Up to ``limit`` posts older than ``before_id``, newest first.
+
+        Keyset pagination: pages inside the ring buffer are served from
+        memory, anything older falls through to an indexed query.
+        """
+        posts = []
+        with self._lock:
+            if before_id is None or (self._posts and before_id > self._posts[0]["id"]):
+                for post in reversed(self._posts):
+                    if len(posts) == limit:
+                        break
+                    if before_id is None or post["id"] < before_id:
+                        posts.append(post)
+        if len(posts) < limit:
+            cursor = posts[-1]["id"] if posts else before_id
+            if cursor is None or cursor > 1:
+                posts.extend(self.db.list_posts(limit=limit - len(posts), before_id=cursor))
+        return posts
@@ -0,0 +1,258 @@
+"""Puzzle engines for the Brain Games tab.
+
+Sudoku grids are 81-character strings (``0`` for an empty cell). The solver
+keeps one 9-bit candidate mask per row, column and box and always fills the
+cell with the fewest candidates next, so counting solutions of a typical
+puzzle takes a few milliseconds. The generator fills a random grid, then
+removes clues in symmetric pairs while the puzzle still has exactly one
+solution, until the difficulty's clue count is reached.
+
+A 2048 board is a single 64-bit integer: sixteen 4-bit cells holding the
+tile's exponent (``0`` empty, ``1`` = 2, ``2`` = 4, ...). Moves slide whole
+16-bit rows through memoized lookup tables (at most 65,536 entries each).
+"""
+import functools
+import random
+
+# ==========================================
+# SUDOKU
+# ==========================================
+DIFFICULTY_CLUES = {"Easy": 40, "Medium": 32, "Hard": 26}
+ALL_DIGITS = 0x1FF  # bits 0-8 stand for digits 1-9
+
+_ROW = [i // 9 for i in range(81)]
+_COL = [i % 9 for i in range(81)]
+_BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+_BIT_DIGIT = {1 << d: d + 1 for d in range(9)}
+
+
+def _masks(cells):
+    """Used-digit masks per row, column and box, or None if a digit repeats."""
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    for i, digit in enumerate(cells):
+        if digit:
+            bit = 1 << (digit - 1)
+            r, c, b = _ROW[i], _COL[i], _BOX[i]
+            if (rows[r] | cols[c] | boxes[b]) & bit:
+                return None
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[b] |= bit
+    return rows, cols, boxes
+
+
+def _search(cells, rows, cols, boxes, limit, solutions, rng):
+    # Pick the empty cell with the fewest candidates (MRV)
+    best, best_mask, best_count = -1, 0, 10
+    for i in range(81):
+        if cells[i]:
+            continue
+        mask = ALL_DIGITS & ~(rows[_ROW[i]] | cols[_COL[i]] | boxes[_BOX[i]])
+        count = bin(mask).count("1")
+        if count < best_count:
+            best, best_mask, best_count = i, mask, count
+            if count <= 1:
+                break
+    if best < 0:
+        solutions.append(cells[:])
+        return len(solutions) >= limit
+    if not best_mask:
+        return False
+
+    bits = []
+    while best_mask:
+        bit = best_mask & -best_mask
+        bits.append(bit)
+        best_mask ^= bit
+    if rng is not None:
+        rng.shuffle(bits)
+    r, c, b = _ROW[best], _COL[best], _BOX[best]
+    for bit in bits:
+        cells[best] = _BIT_DIGIT[bit]
+        rows[r] |= bit
+        cols[c] |= bit
+        boxes[b] |= bit
+        done = _search(cells, rows, cols, boxes, limit, solutions, rng)
+        rows[r] ^= bit
+        cols[c] ^= bit
+        boxes[b] ^= bit
+        if done:
+            cells[best] = 0
+            return True
+    cells[best] = 0
+    return False
+
+
+def solve(grid, limit=1, rng=None):
+    """Up to ``limit`` solutions of ``grid`` (an 81-char string), as strings."""
+    cells = [int(ch) for ch in grid]
+    masks = _masks(cells)
+    if masks is None:
+        return []
+    solutions = []
+    _search(cells, *masks, limit, solutions, rng)
+    return ["".join(map(str, s)) for s in solutions]
+
+
+def has_unique_solution(grid):
+    return len(solve(grid, limit=2)) == 1
+
+
+def _remove_clues(solution, target, rng):
+    cells = list(solution)
+    clues = 81
+    order = list(range(41))  # cell 40 is the centre, its own partner
+    rng.shuffle(order)
+    for i in order:
+        if clues <= target:
+            break
+        pair = {i, 80 - i}
+        saved = {j: cells[j] for j in pair}
+        for j in pair:
+            cells[j] = "0"
+        if has_unique_solution("".join(cells)):
+            clues -= len(pair)
+        else:
+            for j, digit in saved.items():
+                cells[j] = digit
+    if clues > target:
+        # No pair can go without a second solution; single cells still might
+        singles = [i for i in range(81) if cells[i] != "0"]
+        rng.shuffle(singles)
+        for i in singles:
+            if clues <= target:
+                break
+            cells[i] = "0"
+            if has_unique_solution("".join(cells)):
+                clues -= 1
+            else:
+                cells[i] = solution[i]
+    return "".join(cells), clues
+
+
+def generate_sudoku(difficulty="Medium", rng=None):
+    """A ``(puzzle, solution)`` pair with exactly one solution.
+
+    The puzzle has the difficulty's clue count, or one fewer when the last
+    clues came out as a pair. Clues are removed in 180-degree-symmetric
+    pairs, then one at a time; a grid that still gets stuck above the count
+    (about one Hard grid in fifteen) is replaced by a fresh one.
+    """
+    rng = rng or random.Random()
+    target = DIFFICULTY_CLUES[difficulty]
+    while True:
+        solution = solve("0" * 81, rng=rng)[0]
+        puzzle, clues = _remove_clues(solution, target, rng)
+        if clues <= target:
+            return puzzle, solution
+
+
+def conflicts(grid):
+    """Indexes of filled cells that clash with another cell in their row, column or box."""
+    clashing = set()
+    for group in (_ROW, _COL, _BOX):
+        seen = {}
+        for i, ch in enumerate(grid):
+            if ch != "0":
+                seen.setdefault((group[i], ch), []).append(i)
+        for cells in seen.values():
+            if len(cells) > 1:
+                clashing.update(cells)
+    return clashing
+
+
+# ==========================================
+# 2048
+# ==========================================
+LEFT, RIGHT, UP, DOWN = "left", "right", "up", "down"
+
+
+@functools.cache
+def _slide_left(row):
+    """Slide one 16-bit row towards the low nibble: ``(new_row, score)``."""
+    tiles = [(row >> (4 * i)) & 0xF for i in range(4)]
+    tiles = [t for t in tiles if t]
+    merged, score, i = [], 0, 0
+    while i < len(tiles):
+        if i + 1 < len(tiles) and tiles[i] == tiles[i + 1] and tiles[i] < 15:
+            merged.append(tiles[i] + 1)
+            score += 1 << (tiles[i] + 1)
+            i += 2
+        else:
+            merged.append(tiles[i])
+            i += 1
+    result = 0
+    for n, t in enumerate(merged):
+        result |= t << (4 * n)
+    return result, score
+
+
+def _reverse_row(row):
+    return ((row & 0xF) << 12) | ((row & 0xF0) << 4) | ((row >> 4) & 0xF0) | (row >> 12)
+
+
+@functools.cache
+def _slide_right(row):
+    moved, score = _slide_left(_reverse_row(row))
+    return _reverse_row(moved), score
+
+
+def _transpose(board):
+    """Swap rows and columns of a packed board."""
+    result = 0
+    for r in range(4):
+        for c in range(4):
+            result |= ((board >> (4 * (4 * r + c))) & 0xF) << (4 * (4 * c + r))
+    return result
+
+
+def _move_rows(board, slide):
+    result, score = 0, 0
+    for r in range(4):
+        row, points = slide((board >> (16 * r)) & 0xFFFF)
+        result |= row << (16 * r)
+        score += points
+    return result, score
+
+
+def move(board, direction):
+    """``(new_board, points)`` after sliding every tile in ``direction``."""
+    if direction in (LEFT, RIGHT):
+        return _move_rows(board, _slide_left if direction == LEFT else _slide_right)
+    moved, score = _move_rows(_transpose(board), _slide_left if direction == UP else _slide_right)
+    return _transpose(moved), score
+
+
+def add_tile(board, rng=None):
+    """Drop a 2 (90%) or a 4 into a random empty cell."""
+    rng = rng or random
+    empty = [i for i in range(16) if not (board >> (4 * i)) & 0xF]
+    if not empty:
+        return board
+    exponent = 1 if rng.random() < 0.9 else 2
+    return board | (exponent << (4 * rng.choice(empty)))
+
+
+def new_board(rng=None):
+    return add_tile(add_tile(0, rng), rng)
+
+
+def can_move(board):
+    return any(move(board, direction)[0] != board for direction in (LEFT, RIGHT, UP, DOWN))
+
+
+def tiles(board):
+    """The board as four rows of tile values (0 for empty)."""
+    return [
+        [(1 << e) if (e := (board >> (4 * (4 * r + c))) & 0xF) else 0 for c in range(4)]
+        for r in range(4)
+    ]
+
+
+def board_html(board):
+    """HTML grid for a 2048 board; tile colours come from static/momenta.css."""
+    cells = "".join(
+        f'<div class="tile tile-{min(value, 4096)}">{value or ""}</div>'
+        for row in tiles(board) for value in row
+    )
+    return f'<div class="board-2048">{cells}</div>'
@@ -0,0 +1,178 @@
+"""Pre-generated Sudoku puzzles for the Brain Games tab.
+
+Generating a unique-solution puzzle takes anywhere from a few milliseconds
+to a few hundred for Hard, so "New puzzle" never generates one on the
+script thread. ``PuzzleBank`` (shared by every session, see
+``get_puzzle_bank`` in ``app.py``) pops a ready puzzle from the
+``puzzle_bank`` table with one indexed lookup and delete. The bank starts
+filling when the Brain Games section first opens, and whenever a
+difficulty drops below its low-water mark a batch is queued.
+
+Batches run in child interpreters (``python -m puzzles``), each driven by a
+thread that waits on it, so generation never holds the GIL the app needs.
+The server is never forked: it is multithreaded, and a forked copy would
+inherit whatever locks those threads held. A spawned multiprocessing pool
+is no better, since under Streamlit it re-imports app.py in every worker.
+The number of concurrent batches is capped by the CPUs this process may
+run on and by ``MOMENTA_PUZZLE_WORKERS``. Finished batches are written
+back to the database.
+"""
+import collections
+import concurrent.futures
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from games import DIFFICULTY_CLUES, generate_sudoku
+
+BANK_TARGET = int(os.environ.get("MOMENTA_PUZZLE_BANK_SIZE", 50))  # puzzles kept per difficulty
+BANK_LOW_WATER = max(1, BANK_TARGET // 2)
+BATCH_SIZE = 10
+BATCH_TIMEOUT = 120  # seconds before a stuck batch is abandoned
+
+
+def available_cpus():
+    """CPUs this process may run on (its affinity mask, not the machine's count)."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+PUZZLE_WORKERS = max(1, min(available_cpus(), int(os.environ.get("MOMENTA_PUZZLE_WORKERS", 4))))
+
+
+def generate_batch(difficulty, count, seed):
+    """``(puzzles, cpu_seconds)`` for ``count`` puzzles; what a child interpreter runs."""
+    rng = random.Random(seed)
+    started = time.process_time()
+    puzzles = [generate_sudoku(difficulty, rng) for _ in range(count)]
+    return puzzles, time.process_time() - started
+
+
+def run_batch(difficulty, count, seed):
+    """``generate_batch`` in a fresh interpreter that imports only this module and games.py."""
+    proc = subprocess.run(
+        [sys.executable, "-m", "puzzles", difficulty, str(count), str(seed)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True, timeout=BATCH_TIMEOUT,
+    )
+    puzzles, cpu_seconds = json.loads(proc.stdout)
+    return [tuple(pair) for pair in puzzles], cpu_seconds
+
+
+class PuzzleBank:
+    """Sudoku puzzles by difficulty, topped up in the background."""
+
+    def __init__(self, db, target=BANK_TARGET, low_water=BANK_LOW_WATER, workers=PUZZLE_WORKERS):
+        self.db = db
+        self.target = target
+        self.low_water = low_water
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._pool = None  # started on the first refill
+        self._counts = collections.Counter(db.count_puzzles())
+        self._pending = collections.Counter()  # puzzles being generated, by difficulty
+        self._generated = collections.Counter()
+        self._cpu_seconds = collections.Counter()
+        self._running = 0  # batches in flight right now
+        self._peak_running = 0
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="puzzle-bank")
+        return self._pool
+
+    def _run(self, difficulty, count, seed):
+        with self._lock:
+            self._running += 1
+            self._peak_running = max(self._peak_running, self._running)
+        try:
+            return run_batch(difficulty, count, seed)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def refill(self, difficulty=None):
+        """Queue batches for every difficulty (or one) below the low-water mark.
+
+        Cheap when the bank is full, so the Brain Games section calls it on
+        every run; nothing is generated until someone opens it.
+        """
+        for level in [difficulty] if difficulty else DIFFICULTY_CLUES:
+            with self._lock:
+                available = self._counts[level] + self._pending[level]
+                if available >= self.low_water:
+                    continue
+                missing = self.target - available
+                batches = [min(BATCH_SIZE, missing - n) for n in range(0, missing, BATCH_SIZE)]
+                self._pending[level] += missing
+            for count in batches:
+                future = self._executor().submit(self._run, level, count, random.getrandbits(64))
+                future.add_done_callback(lambda f, level=level, count=count: self._store(level, count, f))
+
+    def _store(self, difficulty, count, future):
+        try:
+            puzzles, cpu_seconds = future.result()
+            self.db.add_puzzles(difficulty, puzzles)
+        except Exception:
+            with self._lock:
+                self._pending[difficulty] -= count
+            return  # the next pop retries
+        with self._lock:
+            self._pending[difficulty] -= count
+            self._counts[difficulty] += len(puzzles)
+            self._generated[difficulty] += len(puzzles)
+            self._cpu_seconds[difficulty] += cpu_seconds
+
+    def pop(self, difficulty):
+        """A ``(puzzle, solution)`` pair, straight from the bank when it has one."""
+        pair = self.db.pop_puzzle(difficulty)
+        if pair is not None:
+            with self._lock:
+                self._counts[difficulty] = max(0, self._counts[difficulty] - 1)
+        else:
+            pair = generate_sudoku(difficulty)  # bank ran dry: make one now
+        self.refill(difficulty)
+        return pair
+
+    def stats(self):
+        """Bank levels and generation throughput.
+
+        ``per_core`` is puzzles generated per CPU-second spent in the
+        workers, i.e. the rate one core sustains. ``workers`` is the most
+        batches that have run at once.
+        """
+        with self._lock:
+            levels = {
+                difficulty: {
+                    "available": self._counts[difficulty],
+                    "pending": self._pending[difficulty],
+                    "generated": self._generated[difficulty],
+                    "per_core": (self._generated[difficulty] / self._cpu_seconds[difficulty]
+                                 if self._cpu_seconds[difficulty] else 0.0),
+                }
+                for difficulty in DIFFICULTY_CLUES
+            }
+            cpu_seconds = sum(self._cpu_seconds.values())
+            return {
+                "levels": levels,
+                "workers": self._peak_running,
+                "per_core": sum(self._generated.values()) / cpu_seconds if cpu_seconds else 0.0,
+            }
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+
+
+def main(argv):
+    difficulty, count, seed = argv
+    json.dump(generate_batch(difficulty, int(count), int(seed)), sys.stdout)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,193 @@
+"""Recurrence rules for Family Manager chores.
+
+Rules use the iCalendar RRULE syntax (RFC 5545) for the subset the app
+needs: ``FREQ`` of DAILY, WEEKLY, MONTHLY or YEARLY (birthdays in linked
+calendars), plus ``INTERVAL``, ``COUNT``, ``UNTIL`` and, for weekly rules,
+plain ``BYDAY`` weekdays. Anything else
+(``BYMONTHDAY``, ``BYSETPOS``, ordinal ``BYDAY`` such as ``2TU``, ...) is
+rejected with ``ValueError`` rather than silently ignored. Occurrences are expanded lazily
+and only for the requested date window: the first occurrence in the window
+is found arithmetically, so a chore that started years ago costs no more
+to expand than one that started yesterday.
+"""
+import calendar
+import datetime
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+SUPPORTED_PARTS = {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYDAY", "WKST"}
+
+# Default rule for each option in the "Frequency" selectbox.
+FREQUENCY_RULES = {
+    "Daily": "FREQ=DAILY",
+    "Weekly": "FREQ=WEEKLY",
+    "Monthly": "FREQ=MONTHLY",
+    "One-time": None,
+}
+
+
+def _parse_date(value):
+    # UNTIL may be a DATE (20250101) or a DATE-TIME (20250101T000000Z)
+    return datetime.datetime.strptime(value[:8], "%Y%m%d").date()
+
+
+class RecurrenceRule:
+    """A parsed RRULE."""
+
+    def __init__(self, freq, interval=1, count=None, until=None, byday=None):
+        if freq not in ("DAILY", "WEEKLY", "MONTHLY", "YEARLY"):
+            raise ValueError(f"Unsupported FREQ: {freq}")
+        if interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.byday = sorted(byday) if byday else None  # weekday numbers, Monday = 0
+
+    @classmethod
+    def parse(cls, text):
+        """Parse ``FREQ=WEEKLY;BYDAY=MO,WE`` (an optional ``RRULE:`` prefix is allowed).
+
+        Raises ``ValueError`` for parts outside the supported subset.
+        """
+        if text.upper().startswith("RRULE:"):
+            text = text[6:]
+        parts = dict(part.split("=", 1) for part in text.strip().upper().split(";") if part)
+        unknown = set(parts) - SUPPORTED_PARTS
+        if unknown:
+            raise ValueError(f"Unsupported RRULE parts: {', '.join(sorted(unknown))}")
+        interval = int(parts.get("INTERVAL", 1))
+        if parts.get("WKST", "MO") != "MO" and interval > 1:
+            # Only multi-week intervals depend on where the week starts
+            raise ValueError(f"Unsupported WKST: {parts['WKST']}")
+        byday = None
+        if "BYDAY" in parts:
+            if parts.get("FREQ") != "WEEKLY":
+                raise ValueError("BYDAY is only supported for weekly rules")
+            days = parts["BYDAY"].split(",")
+            if any(day not in WEEKDAYS for day in days):
+                raise ValueError(f"Unsupported BYDAY: {parts['BYDAY']}")
+            byday = sorted({WEEKDAYS.index(day) for day in days})
+        return cls(
+            parts.get("FREQ"),
+            interval=interval,
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=_parse_date(parts["UNTIL"]) if "UNTIL" in parts else None,
+            byday=byday,
+        )
+
+    def __str__(self):
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until:%Y%m%d}")
+        if self.byday:
+            parts.append("BYDAY=" + ",".join(WEEKDAYS[day] for day in self.byday))
+        return ";".join(parts)
+
+    def between(self, dtstart, start, end):
+        """Yield occurrence dates within ``[start, end]``, in order."""
+        if self.until is not None:
+            end = min(end, self.until)
+        if end < dtstart or end < start:
+            return
+        start = max(start, dtstart)
+        if self.freq == "DAILY":
+            yield from self._daily(dtstart, start, end)
+        elif self.freq == "WEEKLY":
+            yield from self._weekly(dtstart, start, end)
+        elif self.freq == "MONTHLY":
+            yield from self._monthly(dtstart, start, end)
+        else:
+            yield from self._yearly(dtstart, start, end)
+
+    def _daily(self, dtstart, start, end):
+        n = -(-(start - dtstart).days // self.interval)  # ceiling division
+        day = dtstart + datetime.timedelta(days=n * self.interval)
+        step = datetime.timedelta(days=self.interval)
+        while day <= end and (self.count is None or n < self.count):
+            yield day
+            day += step
+            n += 1
+
+    def _weekly(self, dtstart, start, end):
+        days = self.byday or [dtstart.weekday()]
+        first_monday = dtstart - datetime.timedelta(days=dtstart.weekday())
+        # Occurrences that would fall before dtstart in its own week don't count.
+        skipped = sum(1 for day in days if day < dtstart.weekday())
+        week = max(0, (start - first_monday).days // 7 // self.interval)
+        while True:
+            monday = first_monday + datetime.timedelta(weeks=week * self.interval)
+            if monday > end:
+                return
+            for i, weekday in enumerate(days):
+                n = week * len(days) + i - skipped
+                if n < 0:
+                    continue
+                if self.count is not None and n >= self.count:
+                    return
+                day = monday + datetime.timedelta(days=weekday)
+                if day > end:
+                    return
+                if day >= start:
+                    yield day
+            week += 1
+
+    def _monthly(self, dtstart, start, end):
+        months_in = (start.year - dtstart.year) * 12 + start.month - dtstart.month
+        step = max(0, months_in // self.interval)
+        if self.count is not None and dtstart.day > 28:
+            # Months without this day are skipped and don't count towards
+            # COUNT, so the occurrence number has to be walked from the start.
+            step = 0
+        n = step if dtstart.day <= 28 else None
+        seen = 0
+        while True:
+            month_index = dtstart.month - 1 + step * self.interval
+            year, month = dtstart.year + month_index // 12, month_index % 12 + 1
+            if datetime.date(year, month, 1) > end:
+                return
+            if dtstart.day <= calendar.monthrange(year, month)[1]:
+                index = n if n is not None else seen
+                if self.count is not None and index >= self.count:
+                    return
+                day = datetime.date(year, month, dtstart.day)
+                if start <= day <= end:
+                    yield day
+                seen += 1
+            step += 1
+            if n is not None:
+                n += 1
+
+
+    def _yearly(self, dtstart, start, end):
+        leap_day = (dtstart.month, dtstart.day) == (2, 29)
+        step = max(0, (start.year - dtstart.year) // self.interval)
+        if self.count is not None and leap_day:
+            # As in _monthly: years without Feb 29 are skipped and don't count.
+            step = 0
+        n = None if leap_day else step
+        seen = 0
+        while True:
+            year = dtstart.year + step * self.interval
+            if datetime.date(year, 1, 1) > end:
+                return
+            if not leap_day or calendar.isleap(year):
+                index = n if n is not None else seen
+                if self.count is not None and index >= self.count:
+                    return
+                day = dtstart.replace(year=year)
+                if start <= day <= end:
+                    yield day
+                seen += 1
+            step += 1
+            if n is not None:
+                n += 1
+
+
+def rule_for(task):
+    """The task's ``RecurrenceRule``, or None for one-time tasks."""
+    return RecurrenceRule.parse(task["rrule"]) if task.get("rrule") else None
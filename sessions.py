@@ -0,0 +1,147 @@
+"""Per-session memory accounting and offloading of cold session state.
+
+Users, posts, tasks, journals and chat live in SQLite and in the shared
+caches built in ``app.py``. What each session still keeps in
+``st.session_state`` is its own view state: the feed view, paging cursors
+and game boards. ``SessionMemory`` (shared by every session, see
+``get_session_memory`` in ``app.py``) measures that state on every full run
+and keeps a registry of recently seen sessions, so ``report`` can give
+approximate bytes per session and per key.
+
+Each dashboard section owns a few keys. Keys owned by sections that are not
+on screen are cold and are offloaded at the start of the run. Persistent
+keys (games in progress) are stashed in the ``session_stash`` table and
+restored when their section opens again. Other keys are just dropped and
+rebuilt by their section, and ``feed_view`` can always be rebuilt from the
+shared feed. A session still over ``max_bytes`` also sheds its largest
+section keys.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+import types
+
+SESSION_MAX_BYTES = int(os.environ.get("MOMENTA_SESSION_MAX_BYTES", 256 * 1024))
+SESSION_FORGET_SECONDS = int(os.environ.get("MOMENTA_SESSION_FORGET_SECONDS", 60 * 60))
+
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType)
+
+
+def approx_size(obj, skip=frozenset()):
+    """Deep ``sys.getsizeof`` of ``obj``, counting each object once.
+
+    Objects whose ``id`` is in ``skip`` (owned by a shared cache) cost only
+    the reference to them. Classes, modules and functions are not followed.
+    """
+    seen = set(skip)
+    total = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, collections.deque)):
+            stack.extend(item)
+        elif not isinstance(item, _OPAQUE) and hasattr(item, "__dict__"):
+            stack.append(vars(item))
+    return total
+
+
+class SessionMemory:
+    """Registry of session footprints and the policy that keeps them small."""
+
+    def __init__(self, db, persistent=(), shared=None, max_bytes=SESSION_MAX_BYTES,
+                 forget_after=SESSION_FORGET_SECONDS):
+        self.db = db
+        self.persistent = frozenset(persistent)  # keys stashed in the database rather than dropped
+        self.shared = shared  # callable returning objects owned by shared caches
+        self.max_bytes = max_bytes
+        self.forget_after = forget_after
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> {"user", "last_seen", "keys": {key: bytes}}
+        self.offloaded = collections.Counter()  # key -> times offloaded
+
+    def measure(self, session_id, user, state):
+        """Record and return approximate bytes per key of one session's state."""
+        skip = {id(obj) for obj in self.shared()} if self.shared else frozenset()
+        sizes = {key: approx_size(state[key], skip) for key in list(state.keys())}
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = {"user": user, "last_seen": now, "keys": sizes}
+            for stale in [sid for sid, s in self._sessions.items() if now - s["last_seen"] > self.forget_after]:
+                del self._sessions[stale]
+        return sizes
+
+    def offload(self, user, state, keys):
+        """Remove ``keys`` from ``state``, stashing persistent ones for ``user``. Returns the keys removed."""
+        removed = []
+        for key in keys:
+            if key not in state:
+                continue
+            if key in self.persistent and user:
+                self.db.stash_session_value(user, key, state[key])
+            del state[key]
+            removed.append(key)
+        with self._lock:
+            self.offloaded.update(removed)
+        return removed
+
+    def restore(self, user, key):
+        """The value stashed for ``key`` (taken out of the stash), or None."""
+        return self.db.pop_session_value(user, key) if user else None
+
+    def enforce(self, session_id, user, state, cold, offloadable=()):
+        """Apply the policy for one full run. Returns the remaining bytes per key.
+
+        ``cold`` keys are always offloaded. Then, while the session is over
+        ``max_bytes``, the largest ``offloadable`` keys go too; their
+        sections rebuild (or restore) them when they next run.
+        """
+        self.offload(user, state, cold)
+        sizes = self.measure(session_id, user, state)
+        excess = sum(sizes.values()) - self.max_bytes
+        for key in sorted((k for k in offloadable if k in sizes), key=sizes.get, reverse=True):
+            if excess <= 0:
+                break
+            self.offload(user, state, [key])
+            excess -= sizes.pop(key)
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions[session_id]["keys"] = sizes
+        return sizes
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def report(self):
+        """Approximate bytes per session and per key over recently seen sessions."""
+        now = time.monotonic()
+        with self._lock:
+            sessions = [(sid, dict(s)) for sid, s in self._sessions.items()]
+            offloaded = dict(self.offloaded)
+        by_key = collections.Counter()
+        per_session = []
+        for sid, session in sessions:
+            by_key.update(session["keys"])
+            per_session.append({
+                "session": sid,
+                "user": session["user"],
+                "bytes": sum(session["keys"].values()),
+                "idle_seconds": now - session["last_seen"],
+            })
+        per_session.sort(key=lambda s: s["bytes"], reverse=True)
+        return {
+            "sessions": len(per_session),
+            "bytes": sum(by_key.values()),
+            "by_key": dict(by_key.most_common()),
+            "per_session": per_session,
+            "offloaded": offloaded,
+        }
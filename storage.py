@@ -0,0 +1,755 @@
+"""Persistent storage for Momenta.
+
+All app data lives in one embedded SQLite database shared by every session
+in the process. The database runs in WAL mode so readers never wait on the
+writer; reads go through a small pool of connections and all writes are
+funnelled through a single writer connection.
+"""
+import contextlib
+import datetime
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+from auth import hash_password, is_hashed
+
+DB_PATH = os.environ.get(
+    "MOMENTA_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "momenta.db")
+)
+
+# Imported calendar events (see events.py); ``calendar`` names the source.
+# A recurring series is one row plus one row per overridden instance, which
+# shares the series' UID and carries the original start as ``recurrence_id``
+# ('' for the series itself). ``exdates`` is a JSON list of excluded starts.
+CALENDAR_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS calendar_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    calendar TEXT NOT NULL,
+    uid TEXT NOT NULL,
+    recurrence_id TEXT NOT NULL DEFAULT '',
+    summary TEXT NOT NULL,
+    location TEXT NOT NULL DEFAULT '',
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    all_day INTEGER NOT NULL DEFAULT 0,
+    rrule TEXT,
+    exdates TEXT,
+    hash TEXT,
+    UNIQUE (owner, calendar, uid, recurrence_id)
+);
+"""
+
+SCHEMA = CALENDAR_EVENTS_TABLE + """
+-- ``password`` holds an encoded hash from auth.hash_password
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS family_members (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    name TEXT NOT NULL,
+    designation TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_family_members_owner ON family_members (owner);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    desc TEXT NOT NULL,
+    assignee TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    start TEXT,
+    rrule TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_owner ON tasks (owner);
+
+-- One row per completed occurrence of a recurring task
+CREATE TABLE IF NOT EXISTS task_completions (
+    owner TEXT NOT NULL,
+    task_id INTEGER NOT NULL,
+    occurrence TEXT NOT NULL,
+    PRIMARY KEY (task_id, occurrence)
+);
+CREATE INDEX IF NOT EXISTS idx_task_completions_owner ON task_completions (owner, occurrence);
+
+CREATE TABLE IF NOT EXISTS journals (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_journals_owner ON journals (owner, id);
+
+CREATE TABLE IF NOT EXISTS chat_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chat_history_owner ON chat_history (owner, id);
+
+-- Per-entry output of the mood analytics pipeline (see analytics.py)
+CREATE TABLE IF NOT EXISTS mood_scores (
+    owner TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_id INTEGER NOT NULL,
+    created TEXT NOT NULL,
+    sentiment REAL NOT NULL,
+    stress_hits INTEGER NOT NULL,
+    PRIMARY KEY (source, source_id)
+);
+CREATE INDEX IF NOT EXISTS idx_mood_scores_owner ON mood_scores (owner, created);
+
+-- Highest source ID already scored, per owner and source
+CREATE TABLE IF NOT EXISTS mood_watermarks (
+    owner TEXT NOT NULL,
+    source TEXT NOT NULL,
+    last_id INTEGER NOT NULL,
+    PRIMARY KEY (owner, source)
+);
+
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    owner TEXT PRIMARY KEY,
+    summary TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS community_posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created TEXT NOT NULL
+);
+
+-- Calendars linked by URL and kept up to date by calendar_sync.py
+CREATE TABLE IF NOT EXISTS calendar_feeds (
+    owner TEXT NOT NULL,
+    calendar TEXT NOT NULL,
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    last_synced TEXT,
+    last_status TEXT,
+    PRIMARY KEY (owner, calendar)
+);
+
+-- Pre-generated Sudoku puzzles waiting to be handed out (see puzzles.py)
+CREATE TABLE IF NOT EXISTS puzzle_bank (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    difficulty TEXT NOT NULL,
+    puzzle TEXT NOT NULL,
+    solution TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_puzzle_bank_difficulty ON puzzle_bank (difficulty, id);
+
+-- Cold session state parked by sessions.SessionMemory until its section reopens
+CREATE TABLE IF NOT EXISTS session_stash (
+    owner TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stashed TEXT NOT NULL,
+    PRIMARY KEY (owner, key)
+);
+"""
+
+# How the journal tab used to format entry dates before ``created`` existed
+LEGACY_JOURNAL_DATE_FORMAT = "%B %d, %Y - %I:%M %p"
+
+
+def _backfill_journal_created(conn):
+    rows = conn.execute("SELECT id, date FROM journals WHERE created IS NULL").fetchall()
+    for row in rows:
+        try:
+            created = datetime.datetime.strptime(row["date"], LEGACY_JOURNAL_DATE_FORMAT)
+        except ValueError:
+            created = datetime.datetime.now()
+        conn.execute("UPDATE journals SET created = ? WHERE id = ?", (created.isoformat(), row["id"]))
+
+
+# Relative times ("2 hours ago") that posts stored before ``created`` existed
+LEGACY_POST_AGE = re.compile(r"(\d+)\s+(minute|hour|day|week)s?\s+ago")
+
+
+def _backfill_post_created(conn):
+    now = datetime.datetime.now()
+    rows = conn.execute("SELECT id, time FROM community_posts WHERE created IS NULL").fetchall()
+    for row in rows:
+        age = LEGACY_POST_AGE.fullmatch(row["time"].strip().lower())
+        created = now - datetime.timedelta(**{age.group(2) + "s": int(age.group(1))}) if age else now
+        conn.execute("UPDATE community_posts SET created = ? WHERE id = ?", (created.isoformat(), row["id"]))
+
+
+def _rekey_calendar_events(conn):
+    """Rebuild calendar_events so rows are unique per (uid, recurrence_id), not per uid."""
+    columns = ", ".join(row["name"] for row in conn.execute("PRAGMA table_info(calendar_events)"))
+    conn.execute("ALTER TABLE calendar_events RENAME TO calendar_events_old")
+    conn.execute(CALENDAR_EVENTS_TABLE)
+    conn.execute(f"INSERT INTO calendar_events ({columns}) SELECT {columns} FROM calendar_events_old")
+    conn.execute("DROP TABLE calendar_events_old")
+
+
+# Columns added after a table was first created. Each entry is
+# (table, column, declaration, backfill run once when the column is added);
+# the backfill is either SQL, a function taking the connection, or None.
+MIGRATIONS = [
+    ("tasks", "start", "TEXT", "UPDATE tasks SET start = date('now') WHERE start IS NULL"),
+    ("tasks", "rrule", "TEXT", """UPDATE tasks SET rrule = CASE frequency
+        WHEN 'Daily' THEN 'FREQ=DAILY'
+        WHEN 'Weekly' THEN 'FREQ=WEEKLY'
+        WHEN 'Monthly' THEN 'FREQ=MONTHLY' END"""),
+    ("journals", "created", "TEXT", _backfill_journal_created),
+    ("community_posts", "created", "TEXT", _backfill_post_created),
+    ("chat_history", "created", "TEXT",
+     "UPDATE chat_history SET created = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"),
+    ("calendar_events", "hash", "TEXT", None),
+    ("calendar_events", "recurrence_id", "TEXT NOT NULL DEFAULT ''", _rekey_calendar_events),
+    ("calendar_events", "exdates", "TEXT", None),  # already there when the rebuild above ran
+]
+
+# Columns retired once their data has been migrated, as (table, column).
+DROPPED_COLUMNS = [
+    ("journals", "date"),  # preformatted string, replaced by ``created``
+    ("community_posts", "time"),  # relative time frozen at publish, replaced by ``created``
+]
+
+# Objects that depend on migrated columns, created after MIGRATIONS run.
+LATE_SCHEMA = [
+    "CREATE INDEX IF NOT EXISTS idx_journals_created ON journals (owner, created)",
+    # Full-text index over journal bodies, kept in step with the table by triggers.
+    # The porter tokenizer stems words so "worried" also finds "worrying".
+    """CREATE VIRTUAL TABLE IF NOT EXISTS journals_fts USING fts5(
+        content, content='journals', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS journals_fts_insert AFTER INSERT ON journals BEGIN
+        INSERT INTO journals_fts (rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journals_fts_delete AFTER DELETE ON journals BEGIN
+        INSERT INTO journals_fts (journals_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS journals_fts_update AFTER UPDATE OF content ON journals BEGIN
+        INSERT INTO journals_fts (journals_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO journals_fts (rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+FEED_STATE_COLUMNS = {"etag", "last_modified", "last_synced", "last_status"}
+
+# Seeded on first start so a fresh database looks like the old demo.
+DEMO_USERS = {'demo_mom': 'password123'}
+# Seed posts are dated relative to the first start by ``age``.
+SEED_POSTS = [
+    {"user": "Elena M.", "age": datetime.timedelta(hours=5), "content": "The new Wordle completely stumped me today. Still, a good brain workout. Anyone else struggling?"},
+    {"user": "Sarah J.", "age": datetime.timedelta(hours=2), "content": "Just finished a 5-minute breathing exercise in the car before picking up the kids. Small wins! 🌿"},
+]
+
+
+class Storage:
+    """Repository API over the shared SQLite database.
+
+    One instance is meant to live for the whole process (see
+    ``get_storage`` in ``app.py``). It is safe to call from any thread.
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=4):
+        self.path = path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        with self._write() as conn:
+            self._migrate(conn)
+            self._seed(conn)
+        self._readers = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._readers.put(self._connect())
+
+    # ------------------------------------------
+    # Connection handling
+    # ------------------------------------------
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def _read(self):
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextlib.contextmanager
+    def _write(self):
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+
+    def _fetch(self, sql, params=()):
+        with self._read() as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def _migrate(self, conn):
+        for table, column, declaration, backfill in MIGRATIONS:
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+                if callable(backfill):
+                    backfill(conn)
+                elif backfill:
+                    conn.execute(backfill)
+        for table, column in DROPPED_COLUMNS:
+            columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if column in columns:
+                conn.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+
+        # Databases from before password hashing still hold plain passwords
+        plain = [row for row in conn.execute("SELECT username, password FROM users") if not is_hashed(row["password"])]
+        for row in plain:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (hash_password(row["password"]), row["username"]))
+
+        has_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'journals_fts'"
+        ).fetchone()
+        for statement in LATE_SCHEMA:
+            conn.execute(statement)
+        if not has_fts:
+            # Index entries written before the search index existed
+            conn.execute("INSERT INTO journals_fts (journals_fts) VALUES ('rebuild')")
+
+    def _seed(self, conn):
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone() is None:
+            conn.executemany(
+                "INSERT INTO users (username, password) VALUES (?, ?)",
+                [(username, hash_password(password)) for username, password in DEMO_USERS.items()],
+            )
+        if conn.execute("SELECT 1 FROM community_posts LIMIT 1").fetchone() is None:
+            now = datetime.datetime.now()
+            conn.executemany(
+                "INSERT INTO community_posts (user, content, created) VALUES (?, ?, ?)",
+                [(post["user"], post["content"], (now - post["age"]).isoformat()) for post in SEED_POSTS],
+            )
+
+    def close(self):
+        self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    # ------------------------------------------
+    # Users
+    # ------------------------------------------
+    def get_password(self, username):
+        rows = self._fetch("SELECT password FROM users WHERE username = ?", (username,))
+        return rows[0]["password"] if rows else None
+
+    def add_user(self, username, password):
+        """Create a user with an already-hashed password.
+
+        Returns False if the username is already taken.
+        """
+        with self._write() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)",
+                (username, password),
+            )
+            return cur.rowcount == 1
+
+    def set_password(self, username, password):
+        with self._write() as conn:
+            conn.execute("UPDATE users SET password = ? WHERE username = ?", (password, username))
+
+    # ------------------------------------------
+    # Family members & tasks
+    # ------------------------------------------
+    def list_members(self, owner):
+        return self._fetch(
+            "SELECT name, designation FROM family_members WHERE owner = ? ORDER BY id", (owner,)
+        )
+
+    def add_member(self, owner, name, designation):
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO family_members (owner, name, designation) VALUES (?, ?, ?)",
+                (owner, name, designation),
+            )
+
+    def list_tasks(self, owner):
+        rows = self._fetch(
+            "SELECT id, desc, assignee, frequency, done, start, rrule FROM tasks WHERE owner = ? ORDER BY id",
+            (owner,),
+        )
+        for row in rows:
+            row["done"] = bool(row["done"])
+            row["start"] = datetime.date.fromisoformat(row["start"])
+        return rows
+
+    def add_task(self, owner, desc, assignee, frequency, start, rrule=None):
+        """Add a task starting (or due) on ``start``; ``rrule`` makes it recurring."""
+        with self._write() as conn:
+            cur = conn.execute(
+                "INSERT INTO tasks (owner, desc, assignee, frequency, start, rrule) VALUES (?, ?, ?, ?, ?, ?)",
+                (owner, desc, assignee, frequency, start.isoformat(), rrule),
+            )
+            return cur.lastrowid
+
+    def set_task_done(self, owner, task_id, done):
+        with self._write() as conn:
+            conn.execute(
+                "UPDATE tasks SET done = ? WHERE id = ? AND owner = ?",
+                (int(done), task_id, owner),
+            )
+
+    def list_completions(self, owner, start, end):
+        """``(task_id, date)`` pairs completed between ``start`` and ``end`` inclusive."""
+        rows = self._fetch(
+            "SELECT task_id, occurrence FROM task_completions WHERE owner = ? AND occurrence BETWEEN ? AND ?",
+            (owner, start.isoformat(), end.isoformat()),
+        )
+        return {(row["task_id"], datetime.date.fromisoformat(row["occurrence"])) for row in rows}
+
+    def set_occurrence_done(self, owner, task_id, occurrence, done):
+        with self._write() as conn:
+            if done:
+                conn.execute(
+                    "INSERT OR IGNORE INTO task_completions (owner, task_id, occurrence) VALUES (?, ?, ?)",
+                    (owner, task_id, occurrence.isoformat()),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM task_completions WHERE task_id = ? AND occurrence = ?",
+                    (task_id, occurrence.isoformat()),
+                )
+
+    # ------------------------------------------
+    # Journals
+    # ------------------------------------------
+    def list_journal_headers(self, owner, before=None, limit=10):
+        """One page of entries, newest first, without their bodies.
+
+        Each row has ``id``, ``created`` and a short ``title``. ``before`` is
+        the ``(created, id)`` of the last row on the previous page; paging
+        is a range scan on the ``(owner, created)`` index.
+        """
+        sql = "SELECT id, created, substr(content, 1, 60) AS title FROM journals WHERE owner = ?"
+        params = [owner]
+        if before is not None:
+            created, entry_id = before
+            sql += " AND (created < ? OR (created = ? AND id < ?))"
+            params += [created.isoformat(), created.isoformat(), entry_id]
+        sql += " ORDER BY created DESC, id DESC LIMIT ?"
+        params.append(limit)
+        rows = self._fetch(sql, params)
+        for row in rows:
+            row["created"] = datetime.datetime.fromisoformat(row["created"])
+        return rows
+
+    def get_journal(self, owner, entry_id):
+        rows = self._fetch(
+            "SELECT content FROM journals WHERE id = ? AND owner = ?", (entry_id, owner)
+        )
+        return rows[0]["content"] if rows else None
+
+    def add_journal(self, owner, content, created):
+        """Save an entry; the search index is updated in the same transaction."""
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO journals (owner, content, created) VALUES (?, ?, ?)",
+                (owner, content, created.isoformat()),
+            )
+
+    def search_journals(self, owner, query, start=None, end=None, limit=20):
+        """Best-matching entries for ``query``, optionally between two dates.
+
+        ``query`` is free text: every word must appear (stemmed), and the
+        last word also matches as a prefix so results update while typing.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return []
+        match = " ".join(f'"{word}"' for word in words) + "*"
+        sql = """
+            SELECT j.id, j.created,
+                   snippet(journals_fts, 0, '**', '**', ' … ', 16) AS snippet
+            FROM journals_fts JOIN journals j ON j.id = journals_fts.rowid
+            WHERE journals_fts MATCH ? AND j.owner = ?
+        """
+        params = [match, owner]
+        if start is not None:
+            sql += " AND j.created >= ?"
+            params.append(start.isoformat())
+        if end is not None:
+            # ``end`` is inclusive: everything before the following midnight
+            sql += " AND j.created < ?"
+            params.append((end + datetime.timedelta(days=1)).isoformat())
+        sql += " ORDER BY bm25(journals_fts) LIMIT ?"
+        params.append(limit)
+        rows = self._fetch(sql, params)
+        for row in rows:
+            row["created"] = datetime.datetime.fromisoformat(row["created"])
+        return rows
+
+    # ------------------------------------------
+    # Chat history
+    # ------------------------------------------
+    def list_chat(self, owner, limit=-1):
+        """The last ``limit`` messages (all by default), oldest first."""
+        rows = self._fetch(
+            "SELECT role, content FROM chat_history WHERE owner = ? ORDER BY id DESC LIMIT ?",
+            (owner, limit),
+        )
+        rows.reverse()
+        return rows
+
+    def add_chat(self, owner, role, content):
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO chat_history (owner, role, content, created) VALUES (?, ?, ?, ?)",
+                (owner, role, content, datetime.datetime.now().isoformat()),
+            )
+
+    def clear_chat(self, owner):
+        """Delete the chat, its summary and its mood scores, so it stops counting in Mood Trends."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM chat_history WHERE owner = ?", (owner,))
+            conn.execute("DELETE FROM chat_summaries WHERE owner = ?", (owner,))
+            conn.execute("DELETE FROM mood_scores WHERE owner = ? AND source = 'chat'", (owner,))
+
+    def get_chat_summary(self, owner):
+        rows = self._fetch("SELECT summary FROM chat_summaries WHERE owner = ?", (owner,))
+        return json.loads(rows[0]["summary"]) if rows else None
+
+    def set_chat_summary(self, owner, summary):
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_summaries (owner, summary) VALUES (?, ?)",
+                (owner, json.dumps(summary)),
+            )
+
+    # ------------------------------------------
+    # Community feed
+    # ------------------------------------------
+    def list_posts(self, limit=-1, before_id=None):
+        """Newest posts first, optionally capped at ``limit`` rows.
+
+        ``before_id`` is a keyset cursor: only posts with a smaller ID are
+        returned, which lets the feed page backwards through the index.
+        """
+        if before_id is None:
+            rows = self._fetch(
+                "SELECT id, user, content, created FROM community_posts ORDER BY id DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            rows = self._fetch(
+                "SELECT id, user, content, created FROM community_posts WHERE id < ? ORDER BY id DESC LIMIT ?",
+                (before_id, limit),
+            )
+        for row in rows:
+            row["created"] = datetime.datetime.fromisoformat(row["created"])
+        return rows
+
+    def add_post(self, user, content, created):
+        with self._write() as conn:
+            cur = conn.execute(
+                "INSERT INTO community_posts (user, content, created) VALUES (?, ?, ?)",
+                (user, content, created.isoformat()),
+            )
+            return cur.lastrowid
+
+    # ------------------------------------------
+    # Mood analytics
+    # ------------------------------------------
+    def list_owners(self):
+        return [row["username"] for row in self._fetch("SELECT username FROM users")]
+
+    def list_unscored(self, owner, source, after_id, limit=1000):
+        """Journal entries or user chat messages with an ID above ``after_id``."""
+        if source == "journal":
+            sql = "SELECT id, created, content FROM journals WHERE owner = ? AND id > ? ORDER BY id LIMIT ?"
+        else:
+            sql = ("SELECT id, created, content FROM chat_history "
+                   "WHERE owner = ? AND role = 'user' AND id > ? ORDER BY id LIMIT ?")
+        return self._fetch(sql, (owner, after_id, limit))
+
+    def get_mood_watermark(self, owner, source):
+        rows = self._fetch(
+            "SELECT last_id FROM mood_watermarks WHERE owner = ? AND source = ?", (owner, source)
+        )
+        return rows[0]["last_id"] if rows else 0
+
+    def save_mood_scores(self, owner, source, scores, last_id):
+        """Store a batch of scores and advance the watermark atomically."""
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO mood_scores (owner, source, source_id, created, sentiment, stress_hits) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(owner, source, s["id"], s["created"], s["sentiment"], s["stress_hits"]) for s in scores],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO mood_watermarks (owner, source, last_id) VALUES (?, ?, ?)",
+                (owner, source, last_id),
+            )
+
+    def list_mood_scores(self, owner, since):
+        return self._fetch(
+            "SELECT created, sentiment, stress_hits FROM mood_scores WHERE owner = ? AND created >= ? ORDER BY created",
+            (owner, since.isoformat()),
+        )
+
+    # ------------------------------------------
+    # Calendar events
+    # ------------------------------------------
+    def list_events(self, owner):
+        rows = self._fetch(
+            "SELECT id, calendar, uid, recurrence_id, summary, location, start, end, all_day, rrule, exdates "
+            "FROM calendar_events WHERE owner = ? ORDER BY start",
+            (owner,),
+        )
+        for row in rows:
+            row["start"] = datetime.datetime.fromisoformat(row["start"])
+            row["end"] = datetime.datetime.fromisoformat(row["end"])
+            row["all_day"] = bool(row["all_day"])
+            row["recurrence_id"] = datetime.datetime.fromisoformat(row["recurrence_id"]) if row["recurrence_id"] else None
+            row["exdates"] = [datetime.datetime.fromisoformat(d) for d in json.loads(row["exdates"] or "[]")]
+        return rows
+
+    def upsert_events(self, owner, calendar, events):
+        """Insert or replace events by (UID, recurrence ID) within one calendar.
+
+        An event's optional ``hash`` is the digest of its raw VEVENT text,
+        used by calendar sync to skip unchanged events.
+        """
+        with self._write() as conn:
+            conn.executemany(
+                """INSERT INTO calendar_events
+                    (owner, calendar, uid, recurrence_id, summary, location, start, end, all_day, rrule, exdates, hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (owner, calendar, uid, recurrence_id) DO UPDATE SET
+                    summary = excluded.summary, location = excluded.location, start = excluded.start,
+                    end = excluded.end, all_day = excluded.all_day, rrule = excluded.rrule,
+                    exdates = excluded.exdates, hash = excluded.hash""",
+                [
+                    (owner, calendar, e["uid"], e["recurrence_id"].isoformat() if e.get("recurrence_id") else "",
+                     e["summary"], e["location"], e["start"].isoformat(), e["end"].isoformat(), int(e["all_day"]),
+                     e["rrule"], json.dumps([d.isoformat() for d in e["exdates"]]) if e.get("exdates") else None,
+                     e.get("hash"))
+                    for e in events
+                ],
+            )
+
+    def list_event_hashes(self, owner, calendar):
+        """``{(uid, recurrence_id): hash}`` for every event in one calendar.
+
+        ``recurrence_id`` is the stored ISO string, '' for whole events and series.
+        """
+        rows = self._fetch(
+            "SELECT uid, recurrence_id, hash FROM calendar_events WHERE owner = ? AND calendar = ?", (owner, calendar)
+        )
+        return {(row["uid"], row["recurrence_id"]): row["hash"] for row in rows}
+
+    def delete_events(self, owner, calendar, keys):
+        """Delete events by ``(uid, recurrence_id)`` keys as returned by ``list_event_hashes``."""
+        with self._write() as conn:
+            conn.executemany(
+                "DELETE FROM calendar_events WHERE owner = ? AND calendar = ? AND uid = ? AND recurrence_id = ?",
+                [(owner, calendar, uid, recurrence_id) for uid, recurrence_id in keys],
+            )
+
+    def list_calendars(self, owner):
+        rows = self._fetch(
+            "SELECT DISTINCT calendar FROM calendar_events WHERE owner = ? ORDER BY calendar", (owner,)
+        )
+        return [row["calendar"] for row in rows]
+
+    def delete_calendar(self, owner, calendar):
+        with self._write() as conn:
+            conn.execute("DELETE FROM calendar_events WHERE owner = ? AND calendar = ?", (owner, calendar))
+            conn.execute("DELETE FROM calendar_feeds WHERE owner = ? AND calendar = ?", (owner, calendar))
+
+    def list_feeds(self, owner=None):
+        """Linked calendars for one user, or for everyone when ``owner`` is None."""
+        if owner is None:
+            return self._fetch("SELECT * FROM calendar_feeds ORDER BY owner, calendar")
+        return self._fetch("SELECT * FROM calendar_feeds WHERE owner = ? ORDER BY calendar", (owner,))
+
+    def add_feed(self, owner, calendar, url):
+        """Link ``url`` as ``calendar``, replacing any earlier link and its sync state."""
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO calendar_feeds (owner, calendar, url) VALUES (?, ?, ?)",
+                (owner, calendar, url),
+            )
+
+    def update_feed(self, owner, calendar, **state):
+        """Record sync state (``etag``, ``last_modified``, ``last_synced``, ``last_status``)."""
+        unknown = set(state) - FEED_STATE_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown feed columns: {sorted(unknown)}")
+        columns = ", ".join(f"{name} = ?" for name in state)
+        with self._write() as conn:
+            conn.execute(
+                f"UPDATE calendar_feeds SET {columns} WHERE owner = ? AND calendar = ?",
+                (*state.values(), owner, calendar),
+            )
+
+    # ------------------------------------------
+    # Puzzle bank
+    # ------------------------------------------
+    def count_puzzles(self):
+        rows = self._fetch("SELECT difficulty, COUNT(*) AS n FROM puzzle_bank GROUP BY difficulty")
+        return {row["difficulty"]: row["n"] for row in rows}
+
+    def add_puzzles(self, difficulty, puzzles):
+        """Store ``(puzzle, solution)`` pairs for ``difficulty``."""
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT INTO puzzle_bank (difficulty, puzzle, solution) VALUES (?, ?, ?)",
+                [(difficulty, puzzle, solution) for puzzle, solution in puzzles],
+            )
+
+    def pop_puzzle(self, difficulty):
+        """Remove and return the oldest ``(puzzle, solution)`` for ``difficulty``, or None."""
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT id, puzzle, solution FROM puzzle_bank WHERE difficulty = ? ORDER BY id LIMIT 1",
+                (difficulty,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM puzzle_bank WHERE id = ?", (row["id"],))
+            return row["puzzle"], row["solution"]
+
+    # ------------------------------------------
+    # Session stash
+    # ------------------------------------------
+    def stash_session_value(self, owner, key, value):
+        """Park a JSON-serialisable session-state value, replacing any earlier one."""
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO session_stash (owner, key, value, stashed) VALUES (?, ?, ?, ?)",
+                (owner, key, json.dumps(value), datetime.datetime.now().isoformat()),
+            )
+
+    def pop_session_value(self, owner, key):
+        """Remove and return the value stashed for ``key``, or None."""
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT value FROM session_stash WHERE owner = ? AND key = ?", (owner, key)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM session_stash WHERE owner = ? AND key = ?", (owner, key))
+            return json.loads(row["value"])
@@ -0,0 +1,146 @@
+"""In-memory indexes over the Family Manager to-do list.
+
+``TaskStore`` is shared by every session (see ``get_task_store`` in
+``app.py``). Each user's tasks are loaded from SQLite once and then kept in
+a ``TaskIndex``: a dict by task ID plus secondary indexes by assignee,
+frequency and done-state, so filtered views and completion toggles never
+rescan the whole list. Every change is written through to the database.
+
+Recurring chores are expanded into dated occurrences only for the window
+being viewed (see ``recurrence``); completion is recorded per occurrence.
+"""
+import collections
+import datetime
+import threading
+
+from recurrence import FREQUENCY_RULES, rule_for
+
+FREQUENCIES = list(FREQUENCY_RULES)
+MAX_CACHED_OWNERS = 1000
+
+
+class TaskIndex:
+    """One user's tasks, indexed by ID, assignee, frequency and done-state.
+
+    Index buckets are dicts keyed by task ID, so they keep insertion (ID)
+    order and support O(1) add/remove.
+    """
+
+    def __init__(self, tasks=()):
+        self.by_id = {}
+        self.by_assignee = collections.defaultdict(dict)
+        self.by_frequency = collections.defaultdict(dict)
+        self.by_done = {False: {}, True: {}}
+        self.rules = {}  # parsed RecurrenceRule per recurring task ID
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        self.by_id[task["id"]] = task
+        self.by_assignee[task["assignee"]][task["id"]] = task
+        self.by_frequency[task["frequency"]][task["id"]] = task
+        self.by_done[task["done"]][task["id"]] = task
+        rule = rule_for(task)
+        if rule is not None:
+            self.rules[task["id"]] = rule
+
+    def set_done(self, task_id, done):
+        task = self.by_id[task_id]
+        if task["done"] != done:
+            del self.by_done[task["done"]][task_id]
+            task["done"] = done
+            self.by_done[done][task_id] = task
+        return task
+
+    def query(self, assignee=None, frequency=None, done=None):
+        """Tasks matching every given filter, oldest first.
+
+        Walks the smallest matching bucket and checks membership in the
+        others, so the cost is bounded by the most selective filter.
+        """
+        buckets = []
+        if assignee is not None:
+            buckets.append(self.by_assignee.get(assignee, {}))
+        if frequency is not None:
+            buckets.append(self.by_frequency.get(frequency, {}))
+        if done is not None:
+            buckets.append(self.by_done[done])
+        if not buckets:
+            return list(self.by_id.values())
+        buckets.sort(key=len)
+        smallest, rest = buckets[0], buckets[1:]
+        return [task for task_id, task in smallest.items() if all(task_id in b for b in rest)]
+
+
+class TaskStore:
+    """Per-user ``TaskIndex`` cache with write-through to ``Storage``."""
+
+    def __init__(self, db, max_owners=MAX_CACHED_OWNERS):
+        self.db = db
+        self.max_owners = max_owners
+        self._lock = threading.RLock()
+        self._indexes = collections.OrderedDict()  # owner -> TaskIndex, LRU order
+
+    def _index(self, owner):
+        index = self._indexes.get(owner)
+        if index is None:
+            index = TaskIndex(self.db.list_tasks(owner))
+            self._indexes[owner] = index
+            while len(self._indexes) > self.max_owners:
+                self._indexes.popitem(last=False)
+        else:
+            self._indexes.move_to_end(owner)
+        return index
+
+    def add(self, owner, desc, assignee, frequency, start=None):
+        start = start or datetime.date.today()
+        rrule = FREQUENCY_RULES.get(frequency)
+        with self._lock:
+            task_id = self.db.add_task(owner, desc, assignee, frequency, start, rrule)
+            task = {
+                "id": task_id, "desc": desc, "assignee": assignee, "frequency": frequency,
+                "done": False, "start": start, "rrule": rrule,
+            }
+            self._index(owner).add(task)
+            return task
+
+    def set_done(self, owner, task_id, done):
+        """Record a completion toggle: one indexed UPDATE plus O(1) index moves."""
+        with self._lock:
+            self.db.set_task_done(owner, task_id, done)
+            return self._index(owner).set_done(task_id, done)
+
+    def set_occurrence_done(self, owner, task_id, occurrence, done):
+        """Record completion of one occurrence of a recurring task."""
+        self.db.set_occurrence_done(owner, task_id, occurrence, done)
+
+    def query(self, owner, assignee=None, frequency=None, done=None):
+        with self._lock:
+            return self._index(owner).query(assignee, frequency, done)
+
+    def agenda(self, owner, start, end, assignee=None, frequency=None, done=None):
+        """Items to show for the dates ``start`` to ``end``.
+
+        Each item is ``{"task", "date", "done"}``. One-time tasks appear
+        once with their own done flag; recurring tasks appear once per
+        occurrence inside the window, and nothing outside it is generated.
+        """
+        with self._lock:
+            index = self._index(owner)
+            tasks = index.query(assignee, frequency)
+            rules = {task["id"]: index.rules.get(task["id"]) for task in tasks}
+        completed = self.db.list_completions(owner, start, end) if any(rules.values()) else set()
+
+        items = []
+        for task in tasks:
+            rule = rules[task["id"]]
+            if rule is None:
+                if done is None or task["done"] == done:
+                    items.append({"task": task, "date": task["start"], "done": task["done"]})
+                continue
+            for day in rule.between(task["start"], start, end):
+                is_done = (task["id"], day) in completed
+                if done is None or is_done == done:
+                    items.append({"task": task, "date": day, "done": is_done})
+        items.sort(key=lambda item: (item["date"], item["task"]["id"]))
+        return items
@@ -0,0 +1,24 @@
+"""Mood scores follow the entries and chats they were computed from."""
+import datetime
+
+from analytics import MoodPipeline
+from storage import Storage
+
+
+def test_cleared_chat_stops_counting(tmp_path):
+    db = Storage(str(tmp_path / "mood.db"))
+    pipeline = MoodPipeline(db)
+    db.add_journal("mom", "Calm and grateful today", datetime.datetime.now())
+    db.add_chat("mom", "user", "I'm so stressed and overwhelmed")
+    db.add_chat("mom", "assistant", "What is one small thing you can control?")
+    assert pipeline.update("mom") == 2
+    assert pipeline.daily_trends("mom")["stress_hits"].sum() > 0
+
+    db.clear_chat("mom")
+    daily = pipeline.daily_trends("mom")
+    assert daily["entries"].sum() == 1 and daily["stress_hits"].sum() == 0
+
+    db.add_chat("mom", "user", "Feeling a bit better")
+    assert pipeline.update("mom") == 1  # chats after the clear are still scored
+    assert pipeline.daily_trends("mom")["entries"].sum() == 2
+    db.close()
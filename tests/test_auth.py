@@ -0,0 +1,95 @@
+"""Password hashing, the plain-password migration and login tokens."""
+import sqlite3
+
+import pytest
+
+import auth
+from auth import CredentialStore, hash_password, needs_rehash, verify_password
+from storage import Storage
+
+
+@pytest.fixture(autouse=True)
+def cheap_hashes(monkeypatch):
+    monkeypatch.setattr(auth, "SCRYPT_N", 1024)
+    monkeypatch.setattr(auth, "PBKDF2_ITERATIONS", 1000)
+
+
+@pytest.fixture
+def db(tmp_path):
+    storage = Storage(str(tmp_path / "auth.db"))
+    yield storage
+    storage.close()
+
+
+@pytest.mark.parametrize("scrypt", [True, False])
+def test_hash_round_trip(monkeypatch, scrypt):
+    monkeypatch.setattr(auth, "HAS_SCRYPT", scrypt)
+    encoded = hash_password("password123")
+    assert encoded.startswith("scrypt$1024,8,1$" if scrypt else "pbkdf2_sha256$1000$")
+    assert verify_password("password123", encoded)
+    assert not verify_password("password124", encoded)
+    assert hash_password("password123") != encoded  # salted
+
+
+@pytest.mark.parametrize("stored", ["password123", "", "scrypt$oops", "md5$1$c2FsdA==$c2FsdA==", "scrypt$x$!!$!!"])
+def test_anything_but_a_hash_is_rejected(stored):
+    assert not verify_password("password123", stored)
+
+
+def test_needs_rehash_when_parameters_change(monkeypatch):
+    encoded = hash_password("password123")
+    assert not needs_rehash(encoded)
+    monkeypatch.setattr(auth, "SCRYPT_N", 2048)
+    assert needs_rehash(encoded)
+    assert needs_rehash("password123")
+
+
+def test_plain_passwords_are_hashed_when_the_database_opens(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (username TEXT PRIMARY KEY, password TEXT NOT NULL)")
+    conn.executemany("INSERT INTO users VALUES (?, ?)", [("demo_mom", "password123"), ("dad", "hunter2")])
+    conn.commit()
+    conn.close()
+    db = Storage(path)
+    stored = db.get_password("demo_mom")
+    assert stored.startswith("scrypt$") and verify_password("password123", stored)
+    assert CredentialStore(db).login("dad", "hunter2") is not None
+    db.close()
+    raw = dict(sqlite3.connect(path).execute("SELECT username, password FROM users"))
+    assert "password123" not in raw.values() and "hunter2" not in raw.values()
+
+
+def test_login_upgrades_weak_hashes(db, monkeypatch):
+    store = CredentialStore(db)
+    assert store.register("mom", "secret")
+    assert not store.register("mom", "other")
+    monkeypatch.setattr(auth, "SCRYPT_N", 2048)
+    assert store.login("mom", "wrong") is None
+    assert store.login("nobody", "secret") is None
+    assert store.login("mom", "secret") is not None
+    assert db.get_password("mom").startswith("scrypt$2048,")
+
+
+def test_tokens_expire(db, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(auth.time, "monotonic", lambda: now[0])
+    store = CredentialStore(db, ttl=60)
+    store.register("mom", "secret")
+    token = store.login("mom", "secret")
+    now[0] += 59
+    assert store.session_user(token) == "mom"
+    now[0] += 2
+    assert store.session_user(token) is None
+
+
+def test_tokens_are_evicted_least_recently_used(db):
+    store = CredentialStore(db, cache_size=2)
+    store.register("mom", "secret")
+    first, second = store.login("mom", "secret"), store.login("mom", "secret")
+    assert store.session_user(first) == "mom"  # first is now the most recently used
+    third = store.login("mom", "secret")
+    assert store.session_user(second) is None
+    assert store.session_user(first) == store.session_user(third) == "mom"
+    store.logout(first)
+    assert store.session_user(first) is None
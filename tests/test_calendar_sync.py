@@ -0,0 +1,135 @@
+"""Which feed URLs may be fetched, and the feed size cap, against a local HTTP server."""
+import http.server
+import io
+import socket
+import threading
+import urllib.request
+
+import pytest
+
+from calendar_sync import CalendarSync, _CheckedRedirects, _CountingLines, check_feed_url
+from events import EventStore
+from storage import Storage
+
+FEED = b"""BEGIN:VCALENDAR\r
+BEGIN:VEVENT\r
+UID:practice@example.com\r
+SUMMARY:Soccer practice\r
+DTSTART:20250107T170000\r
+DTEND:20250107T180000\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+@pytest.fixture
+def server():
+    """A local HTTP server; ``server.bodies`` maps paths to the bytes served, ``server.hits`` records paths."""
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            httpd.hits.append(self.path)
+            body = httpd.bodies.get(self.path)
+            self.send_response(200 if body is not None else 404)
+            self.send_header("Content-Length", str(len(body or b"")))
+            self.end_headers()
+            self.wfile.write(body or b"")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    httpd.bodies, httpd.hits = {}, []
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    storage = Storage(str(tmp_path / "sync.db"))
+    yield storage
+    storage.close()
+
+
+@pytest.mark.parametrize("url", [
+    "file:///etc/passwd",
+    "ftp://example.com/family.ics",
+    "http:///family.ics",
+    "http://127.0.0.1/family.ics",
+    "http://localhost:8501/family.ics",
+    "http://10.0.0.8/family.ics",
+    "http://172.16.4.2/family.ics",
+    "http://192.168.1.20/family.ics",
+    "http://169.254.169.254/latest/meta-data/",
+    "http://[::1]/family.ics",
+    "http://[::ffff:127.0.0.1]/family.ics",
+    "http://[::ffff:10.0.0.8]/family.ics",
+    "http://[fd00::1]/family.ics",
+    "http://224.0.0.1/family.ics",
+])
+def test_check_feed_url_rejects_local_and_non_http(url):
+    with pytest.raises(ValueError):
+        check_feed_url(url)
+
+
+def test_check_feed_url_accepts_public_hosts():
+    check_feed_url("https://93.184.216.34/family.ics")
+    check_feed_url("http://127.0.0.1/family.ics", allow_private=True)
+    with pytest.raises(ValueError):
+        check_feed_url("file:///etc/passwd", allow_private=True)
+
+
+def test_redirects_to_private_hosts_are_refused():
+    redirects = _CheckedRedirects(allow_private=False)
+    request = urllib.request.Request("https://93.184.216.34/family.ics")
+    with pytest.raises(ValueError):
+        redirects.redirect_request(request, None, 302, "Found", {}, "http://127.0.0.1:8501/admin")
+    with pytest.raises(ValueError):
+        redirects.redirect_request(request, None, 302, "Found", {}, "file:///etc/passwd")
+
+
+def test_host_that_rebinds_to_loopback_is_refused(server, db, monkeypatch):
+    """The host resolves to a public address for the checks, then to 127.0.0.1 for the fetch."""
+    port = server.server_address[1]
+    answers = ["93.184.216.34", "93.184.216.34", "127.0.0.1"]
+    real_getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(host, *args, **kwargs):
+        if host != "calendar.test":
+            return real_getaddrinfo(host, *args, **kwargs)
+        address = answers.pop(0) if len(answers) > 1 else answers[0]
+        return [(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", (address, port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    server.bodies["/family.ics"] = FEED
+    sync = CalendarSync(db, EventStore(db))
+    result = sync.link("mom", "soccer", f"http://calendar.test:{port}/family.ics").result()
+    assert result["status"] == "error" and "private or local" in result["error"]
+    assert server.hits == []
+    assert db.list_event_hashes("mom", "soccer") == {}
+
+
+def test_private_feeds_sync_when_allowed(server, db):
+    server.bodies["/family.ics"] = FEED
+    sync = CalendarSync(db, EventStore(db), allow_private=True)
+    url = f"http://127.0.0.1:{server.server_address[1]}/family.ics"
+    assert sync.link("mom", "soccer", url).result()["status"] == "updated"
+    assert sync.link("mom", "soccer", url).result()["status"] in ("updated", "unchanged")
+    assert list(db.list_event_hashes("mom", "soccer")) == [("practice@example.com", "")]
+
+
+def test_feeds_over_the_size_cap_are_abandoned(server, db):
+    server.bodies["/big.ics"] = FEED + b"X-PADDING:" + b"x" * 50_000 + b"\r\n"
+    sync = CalendarSync(db, EventStore(db), allow_private=True, max_bytes=4096)
+    result = sync.link("mom", "big", f"http://127.0.0.1:{server.server_address[1]}/big.ics").result()
+    assert result["status"] == "error" and "larger than 4096 bytes" in result["error"]
+    assert db.list_event_hashes("mom", "big") == {}
+
+
+def test_counting_lines_never_reads_past_the_cap():
+    body = io.BytesIO(b"x" * 100_000)  # one line with no newline
+    with pytest.raises(ValueError):
+        list(_CountingLines(body, limit=1000))
+    assert body.tell() <= 1001
+    assert list(_CountingLines(io.BytesIO(FEED), limit=len(FEED))) == FEED.splitlines(keepends=True)
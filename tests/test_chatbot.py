@@ -0,0 +1,77 @@
+"""Reply cache and worker pool behaviour, with stub backends."""
+import chatbot
+from chatbot import REPLY_INTERRUPTED, ChatBackend, ChatWorkerPool, ResponseCache
+
+
+class EchoContext(ChatBackend):
+    """Replies with the context it was given, like a model prompted with it."""
+
+    uses_context = True
+
+    def stream(self, user_message, cancelled, context=None):
+        yield f"{user_message} / {context['recent']}"
+
+
+def test_context_replies_are_not_shared_between_users():
+    cache, pool = ResponseCache(), ChatWorkerPool(EchoContext())
+    alice = "".join(cache.stream("so stressed", pool, {"recent": "alice's secret"}))
+    bob = "".join(cache.stream("so stressed", pool, {"recent": "bob's day"}))
+    assert "alice" in alice and "alice" not in bob
+    assert "".join(cache.stream("so stressed", pool, {"recent": "alice's secret"})) == alice
+    assert cache.stats()["hits"] == 1
+
+
+class Scripted(ChatBackend):
+    """Streams ``chunks``; an exception in the list is raised at that point."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def stream(self, user_message, cancelled, context=None):
+        self.calls += 1
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+
+
+def test_normalized_messages_share_one_entry():
+    cache, backend = ResponseCache(), Scripted(["Breathe ", "in."])
+    pool = ChatWorkerPool(backend)
+    assert "".join(cache.stream("so stressed", pool)) == "Breathe in."
+    assert "".join(cache.stream("  SO stressed!! ", pool)) == "Breathe in."
+    assert backend.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+
+def test_entries_expire(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(chatbot.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(ttl=60)
+    cache.put("hello", "Hi!")
+    now[0] += 59
+    assert cache.get("hello") == "Hi!"
+    now[0] += 2
+    assert cache.get("hello") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(maxsize=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # "b" is now the least recently used
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+
+
+def test_interrupted_replies_are_not_cached():
+    cache, backend = ResponseCache(), Scripted(["Half a ", RuntimeError("backend died")])
+    pool = ChatWorkerPool(backend)
+    reply = "".join(cache.stream("so stressed", pool))
+    assert reply.startswith("Half a ") and REPLY_INTERRUPTED in reply
+    assert cache.stats()["size"] == 0
+    "".join(cache.stream("so stressed", pool))
+    assert backend.calls == 2
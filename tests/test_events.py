@@ -0,0 +1,147 @@
+"""Event parsing and the interval index, against a full scan of every occurrence."""
+import datetime
+import random
+
+from events import EventIndex, EventStore, parse_ics
+from recurrence import RecurrenceRule
+from storage import Storage
+
+BASE = datetime.datetime(2025, 1, 1)
+
+
+def expand(events, until):
+    """Every occurrence of ``events`` up to ``until``, expanded from the first one."""
+    skipped = {}
+    for event in events:
+        if event.get("recurrence_id") is not None:
+            skipped.setdefault(event["uid"], set()).add(event["recurrence_id"])
+        skipped.setdefault(event["uid"], set()).update(event.get("exdates") or ())
+    found = []
+    for event in events:
+        if not event.get("rrule") or event.get("recurrence_id") is not None:
+            if event.get("recurrence_id") is not None or event["start"] not in skipped[event["uid"]]:
+                occurrences = [event]
+            else:
+                occurrences = []
+        else:
+            length = event["end"] - event["start"]
+            days = RecurrenceRule.parse(event["rrule"]).between(event["start"].date(), event["start"].date(), until.date())
+            occurrences = []
+            for day in days:
+                occ_start = datetime.datetime.combine(day, event["start"].time())
+                if occ_start not in skipped[event["uid"]]:
+                    occurrences.append(dict(event, start=occ_start, end=occ_start + length))
+        found.extend((occ["start"], occ["end"], occ["uid"]) for occ in occurrences)
+    return found
+
+
+def full_scan(occurrences, start, end):
+    # Zero-length events count when they start inside the window
+    return sorted(occ for occ in occurrences if occ[0] < end and (occ[1] > start or occ[0] >= start))
+
+
+def random_events(rng, count):
+    events = []
+    for i in range(count):
+        start = BASE + datetime.timedelta(minutes=rng.randrange(0, 365 * 24 * 60, 15))
+        length = datetime.timedelta(minutes=rng.choice([0, 30, 60, 90, 24 * 60, 3 * 24 * 60]))
+        event = {"uid": f"e{i}", "recurrence_id": None, "summary": f"Event {i}", "start": start,
+                 "end": start + length, "rrule": None, "exdates": []}
+        if rng.random() < 0.05:
+            event["rrule"] = rng.choice(["FREQ=DAILY;COUNT=20", "FREQ=WEEKLY;BYDAY=MO,TH", "FREQ=MONTHLY;INTERVAL=2"])
+            # Drop one instance and move another
+            event["exdates"] = [start + datetime.timedelta(days=7)]
+            moved = start + datetime.timedelta(days=14)
+            events.append(dict(event, recurrence_id=moved, rrule=None, exdates=[],
+                               start=moved + datetime.timedelta(hours=2), end=moved + datetime.timedelta(hours=3)))
+        events.append(event)
+    return events
+
+
+def test_between_matches_full_scan():
+    rng = random.Random(21)
+    events = random_events(rng, 5000)
+    index = EventIndex(events)
+    occurrences = expand(events, BASE + datetime.timedelta(days=450))
+    for _ in range(300):
+        start = BASE + datetime.timedelta(hours=rng.randrange(-24 * 30, 24 * 400))
+        end = start + datetime.timedelta(hours=rng.choice([1, 24, 7 * 24, 31 * 24]))
+        got = sorted((occ["start"], occ["end"], occ["uid"]) for occ in index.between(start, end))
+        assert got == full_scan(occurrences, start, end), (start, end)
+
+
+STANDUP = """BEGIN:VCALENDAR
+BEGIN:VEVENT
+UID:standup@example.com
+SUMMARY:Standup
+DTSTART:20250106T090000
+DTEND:20250106T091500
+RRULE:FREQ=WEEKLY;BYDAY=MO,WE
+EXDATE:20250108T090000,20250113T090000
+EXDATE:20250115T090000
+BEGIN:VALARM
+TRIGGER:-PT5M
+END:VALARM
+END:VEVENT
+BEGIN:VEVENT
+UID:standup@example.com
+RECURRENCE-ID:20250120T090000
+SUMMARY:Standup (moved)
+DTSTART:20250120T140000
+DTEND:20250120T141500
+END:VEVENT
+BEGIN:VEVENT
+UID:dentist@example.com
+SUMMARY:Dentist\\, Dr. Lee
+DTSTART;VALUE=DATE:20250110
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+def test_parse_ics_reads_overrides_and_exdates():
+    master, override, dentist = parse_ics(STANDUP.splitlines())
+    assert master["recurrence_id"] is None
+    assert master["exdates"] == [datetime.datetime(2025, 1, 8, 9), datetime.datetime(2025, 1, 13, 9),
+                                 datetime.datetime(2025, 1, 15, 9)]
+    assert override["recurrence_id"] == datetime.datetime(2025, 1, 20, 9)
+    assert dentist["summary"] == "Dentist, Dr. Lee"
+    assert dentist["all_day"] and dentist["end"] - dentist["start"] == datetime.timedelta(days=1)
+
+
+def test_store_applies_overrides_and_exdates(tmp_path):
+    store = EventStore(Storage(str(tmp_path / "events.db")))
+    for _ in range(2):  # re-importing replaces rows instead of adding copies
+        assert store.import_ics("mom", "work", STANDUP.splitlines()) == 3
+    occurrences = store.between("mom", datetime.datetime(2025, 1, 6), datetime.datetime(2025, 1, 25))
+    assert [(occ["summary"], occ["start"]) for occ in occurrences] == [
+        ("Standup", datetime.datetime(2025, 1, 6, 9)),
+        ("Dentist, Dr. Lee", datetime.datetime(2025, 1, 10)),
+        ("Standup (moved)", datetime.datetime(2025, 1, 20, 14)),
+        ("Standup", datetime.datetime(2025, 1, 22, 9)),
+    ]
+
+
+def test_reimport_drops_events_removed_from_the_file(tmp_path):
+    store = EventStore(Storage(str(tmp_path / "events.db")))
+    store.import_ics("mom", "work", STANDUP.splitlines())
+    without_dentist_or_move = STANDUP.split("BEGIN:VEVENT\nUID:standup@example.com\nRECURRENCE-ID")[0] + "END:VCALENDAR\n"
+    assert store.import_ics("mom", "work", without_dentist_or_move.splitlines()) == 1
+    occurrences = store.between("mom", datetime.datetime(2025, 1, 6), datetime.datetime(2025, 1, 25))
+    assert [(occ["summary"], occ["start"]) for occ in occurrences] == [
+        ("Standup", datetime.datetime(2025, 1, 6, 9)),
+        ("Standup", datetime.datetime(2025, 1, 20, 9)),
+        ("Standup", datetime.datetime(2025, 1, 22, 9)),
+    ]
+    store.import_ics("mom", "home", STANDUP.splitlines())  # other calendars are left alone
+    assert store.import_ics("mom", "work", without_dentist_or_move.splitlines()) == 1
+    assert len(store.between("mom", datetime.datetime(2025, 1, 10), datetime.datetime(2025, 1, 11))) == 1
+
+
+def test_yearly_events_repeat(tmp_path):
+    store = EventStore(Storage(str(tmp_path / "events.db")))
+    birthday = ["BEGIN:VEVENT", "UID:kid@example.com", "SUMMARY:Birthday",
+                "DTSTART;VALUE=DATE:20200115", "RRULE:FREQ=YEARLY", "END:VEVENT"]
+    store.import_ics("mom", "family", birthday)
+    occurrences = store.between("mom", datetime.datetime(2027, 1, 1), datetime.datetime(2027, 2, 1))
+    assert [occ["start"] for occ in occurrences] == [datetime.datetime(2027, 1, 15)]
@@ -0,0 +1,82 @@
+"""The bitboard 2048 against a list-based reference, and the Sudoku solver and generator."""
+import random
+
+import pytest
+
+from games import (DIFFICULTY_CLUES, DOWN, LEFT, RIGHT, UP, add_tile, can_move, conflicts,
+                   generate_sudoku, has_unique_solution, move, new_board, solve, tiles)
+
+
+def slide_left(row):
+    """One row of tile values slid left: ``(row, points)``."""
+    values = [v for v in row if v]
+    merged, points, i = [], 0, 0
+    while i < len(values):
+        if i + 1 < len(values) and values[i] == values[i + 1]:
+            merged.append(values[i] * 2)
+            points += values[i] * 2
+            i += 2
+        else:
+            merged.append(values[i])
+            i += 1
+    return merged + [0] * (4 - len(merged)), points
+
+
+def reference_move(grid, direction):
+    """``move`` on four lists of tile values."""
+    if direction in (UP, DOWN):
+        grid = [list(col) for col in zip(*grid)]
+    if direction in (RIGHT, DOWN):
+        grid = [row[::-1] for row in grid]
+    rows, points = [], 0
+    for row in grid:
+        row, gained = slide_left(row)
+        rows.append(row)
+        points += gained
+    if direction in (RIGHT, DOWN):
+        rows = [row[::-1] for row in rows]
+    if direction in (UP, DOWN):
+        rows = [list(col) for col in zip(*rows)]
+    return rows, points
+
+
+def test_moves_match_list_reference():
+    rng = random.Random(23)
+    for _ in range(200):
+        board = new_board(rng)
+        while can_move(board):
+            direction = rng.choice([LEFT, RIGHT, UP, DOWN])
+            moved, points = move(board, direction)
+            assert (tiles(moved), points) == reference_move(tiles(board), direction), (hex(board), direction)
+            if moved != board:
+                board = add_tile(moved, rng)
+
+
+def test_can_move_on_a_full_board():
+    assert not can_move(int("1212" "2121" "1212" "2121", 16))
+    assert can_move(int("1212" "2121" "1212" "2111", 16))
+
+
+def test_solve_finds_every_solution_up_to_the_limit():
+    solution = solve("0" * 81, rng=random.Random(1))[0]
+    assert "0" not in solution and not conflicts(solution)
+    assert len(solve("0" * 81, limit=3)) == 3
+    assert solve("11" + "0" * 79) == []
+
+
+@pytest.mark.parametrize("difficulty", list(DIFFICULTY_CLUES))
+def test_generated_puzzles_are_unique_and_match_their_solution(difficulty):
+    rng = random.Random(difficulty)
+    target = DIFFICULTY_CLUES[difficulty]
+    for _ in range(20):
+        puzzle, solution = generate_sudoku(difficulty, rng)
+        assert has_unique_solution(puzzle)
+        assert solve(puzzle) == [solution]
+        assert all(p in ("0", s) for p, s in zip(puzzle, solution))
+        # Clues come out in symmetric pairs, so the last pair can take it one below the target
+        assert target - 1 <= 81 - puzzle.count("0") <= target
+
+
+def test_conflicts_marks_clashing_cells():
+    grid = "5" + "0" * 7 + "5" + "0" * 72  # two 5s in the top row
+    assert conflicts(grid) == {0, 8}
@@ -0,0 +1,112 @@
+"""RecurrenceRule against a brute-force, day-by-day reading of the RRULE."""
+import calendar
+import datetime
+import random
+
+import pytest
+
+from recurrence import RecurrenceRule, rule_for
+
+
+def reference(rule, dtstart, start, end):
+    """Occurrences in ``[start, end]``, found by testing every day from ``dtstart``."""
+    first_monday = dtstart - datetime.timedelta(days=dtstart.weekday())
+    days = rule.byday or [dtstart.weekday()]
+    found, n = [], 0
+    day = dtstart
+    while day <= end:
+        if rule.until is not None and day > rule.until:
+            break
+        if rule.freq == "DAILY":
+            hit = (day - dtstart).days % rule.interval == 0
+        elif rule.freq == "WEEKLY":
+            hit = ((day - first_monday).days // 7) % rule.interval == 0 and day.weekday() in days
+        elif rule.freq == "YEARLY":
+            hit = (day.year - dtstart.year) % rule.interval == 0 and (day.month, day.day) == (dtstart.month, dtstart.day)
+        else:
+            months = (day.year - dtstart.year) * 12 + day.month - dtstart.month
+            hit = months % rule.interval == 0 and day.day == dtstart.day
+        if hit:
+            if rule.count is not None and n >= rule.count:
+                break
+            n += 1
+            if day >= start:
+                found.append(day)
+        day += datetime.timedelta(days=1)
+    return found
+
+
+def random_rule(rng):
+    freq = rng.choice(["DAILY", "WEEKLY", "MONTHLY", "YEARLY"])
+    parts = [f"FREQ={freq}"]
+    if rng.random() < 0.5:
+        parts.append(f"INTERVAL={rng.randint(2, 5)}")
+    if freq == "WEEKLY" and rng.random() < 0.6:
+        parts.append("BYDAY=" + ",".join(rng.sample(["MO", "TU", "WE", "TH", "FR", "SA", "SU"], rng.randint(1, 4))))
+    if rng.random() < 0.3:
+        parts.append(f"COUNT={rng.randint(1, 30)}")
+    elif rng.random() < 0.3:
+        until = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 900 if freq != "YEARLY" else 4000))
+        parts.append(f"UNTIL={until:%Y%m%d}")
+    return ";".join(parts)
+
+
+def test_between_matches_brute_force():
+    rng = random.Random(12)
+    for _ in range(3000):
+        text = random_rule(rng)
+        rule = RecurrenceRule.parse(text)
+        dtstart = datetime.date(2024, 1, 1) + datetime.timedelta(days=rng.randint(0, 400))
+        # Months ending on the 29th-31st skip the months that lack that day,
+        # and yearly rules starting on Feb 29 skip years that aren't leap years
+        if rule.freq == "MONTHLY" and rng.random() < 0.3:
+            dtstart = dtstart.replace(day=calendar.monthrange(dtstart.year, dtstart.month)[1])
+        if rule.freq == "YEARLY" and rng.random() < 0.3:
+            dtstart = datetime.date(2024, 2, 29)
+        span = 1 if rule.freq != "YEARLY" else 8  # yearly rules need years of windows
+        start = dtstart + datetime.timedelta(days=rng.randint(-30, 500 * span))
+        end = start + datetime.timedelta(days=rng.randint(0, 120 * span))
+        expected = reference(rule, dtstart, start, end)
+        assert list(rule.between(dtstart, start, end)) == expected, (text, dtstart, start, end)
+
+
+def test_parse_round_trips():
+    for text in ["FREQ=DAILY", "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE", "FREQ=MONTHLY;COUNT=6", "FREQ=DAILY;UNTIL=20250101",
+                 "FREQ=YEARLY;INTERVAL=4"]:
+        assert str(RecurrenceRule.parse(text)) == text
+    assert str(RecurrenceRule.parse("RRULE:freq=weekly;byday=fr")) == "FREQ=WEEKLY;BYDAY=FR"
+
+
+@pytest.mark.parametrize("text", [
+    "FREQ=MONTHLY;BYDAY=2TU",
+    "FREQ=MONTHLY;BYDAY=TU",
+    "FREQ=WEEKLY;BYDAY=-1FR",
+    "FREQ=MONTHLY;BYMONTHDAY=15",
+    "FREQ=MONTHLY;BYSETPOS=-1;BYDAY=MO,TU,WE,TH,FR",
+    "FREQ=YEARLY;BYMONTH=1",
+    "FREQ=YEARLY;BYDAY=MO",
+    "FREQ=HOURLY",
+    "FREQ=WEEKLY;INTERVAL=2;WKST=SU",
+    "FREQ=DAILY;INTERVAL=0",
+])
+def test_parse_rejects_unsupported_rules(text):
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse(text)
+
+
+def test_one_time_tasks_have_no_rule():
+    assert rule_for({"rrule": None}) is None
+    assert rule_for({"rrule": "FREQ=DAILY"}).freq == "DAILY"
+
+
+def test_yearly_birthday_keeps_coming_back():
+    birthday = RecurrenceRule.parse("FREQ=YEARLY")
+    assert list(birthday.between(datetime.date(2020, 1, 15), datetime.date(2027, 1, 1), datetime.date(2027, 1, 31))) == [
+        datetime.date(2027, 1, 15)
+    ]
+    leap = RecurrenceRule.parse("FREQ=YEARLY;COUNT=3")
+    assert list(leap.between(datetime.date(2024, 2, 29), datetime.date(2024, 1, 1), datetime.date(2040, 12, 31))) == [
+        datetime.date(2024, 2, 29), datetime.date(2028, 2, 29), datetime.date(2032, 2, 29)
+    ]
+    # COUNT is used up by 2032 even when the window starts long after DTSTART
+    assert list(leap.between(datetime.date(2024, 2, 29), datetime.date(2033, 1, 1), datetime.date(2040, 12, 31))) == []